@@ -6,6 +6,7 @@ Handles messaging, forums, notifications, and announcements
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.services.communication_service import CommunicationService
+from app.services.redis_service import redis_service
 from app.extensions import db
 from datetime import datetime
 import json
@@ -75,6 +76,7 @@ def get_messages():
         folder = request.args.get('folder', 'inbox')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        cursor = request.args.get('cursor')
         
         # Validate folder
         valid_folders = ['inbox', 'sent', 'drafts', 'archived']
@@ -88,7 +90,8 @@ def get_messages():
             user_id=current_user.id,
             folder=folder,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            cursor=cursor
         )
         
         if result["success"]:
@@ -193,6 +196,7 @@ def get_forum_posts():
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
         sort_by = request.args.get('sort_by', 'latest')
+        cursor = request.args.get('cursor')
         
         # Validate sort_by
         valid_sorts = ['latest', 'popular', 'most_viewed']
@@ -206,7 +210,8 @@ def get_forum_posts():
             category=category,
             page=page,
             per_page=per_page,
-            sort_by=sort_by
+            sort_by=sort_by,
+            cursor=cursor
         )
         
         if result["success"]:
@@ -270,12 +275,14 @@ def get_notifications():
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        cursor = request.args.get('cursor')
         
         result = CommunicationService.get_user_notifications(
             user_id=current_user.id,
             unread_only=unread_only,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            cursor=cursor
         )
         
         if result["success"]:
@@ -367,6 +374,7 @@ def mark_notification_read(notification_id):
             notification.is_read = True
             notification.read_at = datetime.utcnow()
             db.session.commit()
+            redis_service.invalidate_listing_totals([f"notifications:{current_user.id}:unread"])
         
         return jsonify({
             "success": True,
@@ -8,7 +8,8 @@ from enum import Enum
 from app.models.communication import (
     Message, MessageRecipient, ForumCategory, ForumPost, 
     ForumReply, ForumPostLike, ForumReplyLike, Notification,
-    Announcement, AnnouncementView, ChatRoom, ChatParticipant, ChatMessage
+    CommunicationDailyStat, Announcement, AnnouncementView,
+    ChatRoom, ChatParticipant, ChatMessage
 )
 
 class UserRole(Enum):
@@ -167,6 +168,10 @@ class Assignment(db.Model):
     teacher = db.relationship('User', backref='assignments_created')
     submissions = db.relationship('Submission', backref='assignment', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_assignment_teacher_due_active', 'teacher_id', 'due_date', 'is_active'),
+    )
+    
     def __repr__(self):
         return f'<Assignment {self.title}>'
 
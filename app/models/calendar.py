@@ -4,10 +4,20 @@ Database models for events, scheduling, and reminders
 """
 
 from app.extensions import db
-from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime, timezone
 import uuid
 
 
+# Native JSON storage: JSONB on Postgres, JSON on MySQL/SQLite
+JSONType = db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
+
+
+def _utcnow():
+    """Timezone-aware UTC timestamp used as column default"""
+    return datetime.now(timezone.utc)
+
+
 class Event(db.Model):
     """Model for calendar events"""
     __tablename__ = 'events'
@@ -16,21 +26,21 @@ class Event(db.Model):
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    start_datetime = db.Column(db.DateTime, nullable=False)
-    end_datetime = db.Column(db.DateTime)
+    start_datetime = db.Column(db.DateTime(timezone=True), nullable=False)
+    end_datetime = db.Column(db.DateTime(timezone=True))
     event_type = db.Column(db.String(20), default='personal')  # assignment, exam, class, meeting, etc.
     priority = db.Column(db.String(10), default='normal')  # low, normal, high, urgent
     location = db.Column(db.String(200))
     is_all_day = db.Column(db.Boolean, default=False)
     is_recurring = db.Column(db.Boolean, default=False)
-    recurrence_rule = db.Column(db.Text)  # JSON string for recurrence settings
+    recurrence_rule = db.Column(JSONType)  # Recurrence settings
     parent_event_id = db.Column(db.String(36), db.ForeignKey('events.id'))  # For recurring events
     timezone = db.Column(db.String(50), default='UTC')
     status = db.Column(db.String(20), default='confirmed')  # confirmed, tentative, cancelled
     visibility = db.Column(db.String(20), default='public')  # public, private, shared
-    event_metadata = db.Column(db.Text)  # JSON string for additional data
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    event_metadata = db.Column(JSONType)  # Additional event data
+    created_at = db.Column(db.DateTime(timezone=True), default=_utcnow)
+    updated_at = db.Column(db.DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
     
     # Relationships
     creator = db.relationship('User', foreign_keys=[creator_id], backref='created_events')
@@ -38,6 +48,12 @@ class Event(db.Model):
     attendees = db.relationship('EventAttendee', backref='event', cascade='all, delete-orphan')
     reminders = db.relationship('EventReminder', backref='event', cascade='all, delete-orphan')
     
+    # Indexes for the date-range and per-creator calendar lookups
+    __table_args__ = (
+        db.Index('ix_event_creator_start', 'creator_id', 'start_datetime'),
+        db.Index('ix_event_start', 'start_datetime'),
+    )
+    
     def __repr__(self):
         return f'<Event {self.id}: {self.title}>'
 
@@ -51,15 +67,19 @@ class EventAttendee(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, accepted, declined, tentative
     role = db.Column(db.String(20), default='attendee')  # organizer, attendee, optional
-    invited_at = db.Column(db.DateTime, default=datetime.utcnow)
-    responded_at = db.Column(db.DateTime)
+    invited_at = db.Column(db.DateTime(timezone=True), default=_utcnow)
+    responded_at = db.Column(db.DateTime(timezone=True))
     notes = db.Column(db.Text)  # Attendee-specific notes
     
     # Relationships
     user = db.relationship('User', foreign_keys=[user_id], backref='event_attendances')
     
     # Unique constraint to prevent duplicate attendees
-    __table_args__ = (db.UniqueConstraint('event_id', 'user_id', name='unique_event_attendee'),)
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'user_id', name='unique_event_attendee'),
+        db.Index('ix_attendee_user_event', 'user_id', 'event_id'),
+        db.Index('ix_attendee_invited', 'invited_at'),
+    )
     
     def __repr__(self):
         return f'<EventAttendee {self.event_id} -> {self.user_id}>'
@@ -75,12 +95,19 @@ class EventReminder(db.Model):
     reminder_type = db.Column(db.String(20), default='notification')  # email, notification, sms, push
     minutes_before = db.Column(db.Integer, default=15)  # Minutes before event to remind
     is_active = db.Column(db.Boolean, default=True)
-    sent_at = db.Column(db.DateTime)  # When the reminder was sent
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime(timezone=True))  # When the reminder was sent
+    created_at = db.Column(db.DateTime(timezone=True), default=_utcnow)
     
     # Relationships
     user = db.relationship('User', foreign_keys=[user_id], backref='event_reminders')
     
+    # Partial index on Postgres/SQLite; a plain composite index elsewhere
+    __table_args__ = (
+        db.Index('ix_reminder_active_unsent', 'is_active', 'sent_at',
+                 postgresql_where=db.text('is_active AND sent_at IS NULL'),
+                 sqlite_where=db.text('is_active AND sent_at IS NULL')),
+    )
+    
     def __repr__(self):
         return f'<EventReminder {self.id} for {self.event_id}>'
 
@@ -4,6 +4,7 @@ Database models for messaging, forums, notifications, and announcements
 """
 
 from app.extensions import db
+from app.models.calendar import JSONType
 from datetime import datetime
 import uuid
 
@@ -14,11 +15,14 @@ class Message(db.Model):
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Snapshot of the sender for inbox rendering; refreshed by refresh_sender_snapshots
+    sender_name = db.Column(db.String(201))
+    sender_role = db.Column(db.String(20))
     subject = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     message_type = db.Column(db.String(20), default='personal')  # personal, announcement, system
     priority = db.Column(db.String(10), default='normal')  # low, normal, high, urgent
-    attachments = db.Column(db.Text)  # JSON string of attachment info
+    attachments = db.Column(JSONType)  # List of attachment info dicts
     is_draft = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -27,6 +31,12 @@ class Message(db.Model):
     sender = db.relationship('User', foreign_keys=[sender_id], backref='sent_messages')
     recipients = db.relationship('MessageRecipient', backref='message', cascade='all, delete-orphan')
     
+    # Supports newest-first keyset pagination and the sent folder
+    __table_args__ = (
+        db.Index('ix_message_created_id', 'created_at', 'id'),
+        db.Index('ix_msg_sender_created', 'sender_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<Message {self.id}: {self.subject}>'
 
@@ -47,6 +57,12 @@ class MessageRecipient(db.Model):
     # Relationships
     recipient = db.relationship('User', foreign_keys=[recipient_id], backref='received_messages')
     
+    # Unread counts and inbox/archive listings filter on the recipient first
+    __table_args__ = (
+        db.Index('ix_mr_recip_unread', 'recipient_id', 'is_read'),
+        db.Index('ix_mr_recip_archived', 'recipient_id', 'is_archived', 'message_id'),
+    )
+    
     def __repr__(self):
         return f'<MessageRecipient {self.message_id} -> {self.recipient_id}>'
 
@@ -81,7 +97,7 @@ class ForumPost(db.Model):
     category = db.Column(db.String(50))  # For backward compatibility
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    tags = db.Column(db.Text)  # JSON string of tags
+    tags = db.Column(JSONType)  # List of tag strings
     is_pinned = db.Column(db.Boolean, default=False)
     is_locked = db.Column(db.Boolean, default=False)
     is_deleted = db.Column(db.Boolean, default=False)
@@ -95,6 +111,12 @@ class ForumPost(db.Model):
     replies = db.relationship('ForumReply', backref='post', cascade='all, delete-orphan')
     likes_rel = db.relationship('ForumPostLike', backref='post', cascade='all, delete-orphan')
     
+    # Supports newest-first keyset pagination, overall and per category
+    __table_args__ = (
+        db.Index('ix_forum_post_created_id', 'created_at', 'id'),
+        db.Index('ix_post_cat_created', 'category', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<ForumPost {self.id}: {self.title}>'
 
@@ -175,10 +197,39 @@ class Notification(db.Model):
     # Relationships
     user = db.relationship('User', foreign_keys=[user_id], backref='notifications')
     
+    # Supports newest-first keyset pagination and per-user listings/unread counts
+    __table_args__ = (
+        db.Index('ix_notification_created_id', 'created_at', 'id'),
+        db.Index('ix_notif_user_created', 'user_id', 'created_at'),
+        db.Index('ix_notif_user_read_created', 'user_id', 'is_read', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<Notification {self.id}: {self.title}>'
 
 
+class CommunicationDailyStat(db.Model):
+    """Per-user daily communication counters, rebuilt by the analytics refresh job"""
+    __tablename__ = 'communication_daily_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    messages_sent = db.Column(db.Integer, default=0)
+    messages_received = db.Column(db.Integer, default=0)
+    forum_posts = db.Column(db.Integer, default=0)
+    notifications_received = db.Column(db.Integer, default=0)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='unique_user_daily_stat'),
+        db.Index('ix_communication_daily_stat_day', 'day'),
+    )
+    
+    def __repr__(self):
+        return f'<CommunicationDailyStat {self.user_id} on {self.day}>'
+
+
 class Announcement(db.Model):
     """Model for system announcements"""
     __tablename__ = 'announcements'
@@ -3,14 +3,17 @@ Calendar & Scheduling Service for SACEL Platform
 Handles events, assignment due dates, exam schedules, and reminders
 """
 
-from datetime import datetime, timedelta, date
-from sqlalchemy import and_, or_, desc, asc, func
+from datetime import datetime, timedelta, date, timezone
+from sqlalchemy import and_, or_, desc, asc, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
 from app.extensions import db
-import json
+from app.models import User, Assignment, Submission
+from app.models.calendar import Event, EventAttendee, EventReminder
+from app.services.communication_service import CommunicationService
+import heapq
 import uuid
 from enum import Enum
 from typing import List, Dict, Optional, Tuple
-import pytz
 from dateutil.rrule import rrule, DAILY, WEEKLY, MONTHLY, YEARLY
 
 class EventType(Enum):
@@ -43,6 +46,30 @@ class RecurrenceType(Enum):
     YEARLY = "yearly"
     CUSTOM = "custom"
 
+_VALID_RESPONSES = frozenset(('accepted', 'declined', 'tentative'))
+
+
+def _as_utc(value: datetime) -> datetime:
+    """
+    Convert a datetime to UTC; naive values, returned by backends without
+    TZ support and by naive columns, are taken to already be UTC
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _insert_ignoring_duplicates(model, index_elements: List[str]):
+    """Build an INSERT that skips rows conflicting with a unique key"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    # MySQL
+    return insert(model).prefix_with('IGNORE')
+
+
 class CalendarService:
     """Service for handling all calendar and scheduling operations"""
     
@@ -74,9 +101,6 @@ class CalendarService:
             Dictionary with creation results
         """
         try:
-            from app.models import User
-            from app.models.calendar import Event, EventAttendee, EventReminder
-            
             # Validate creator exists
             creator = User.query.get(creator_id)
             if not creator:
@@ -86,6 +110,8 @@ class CalendarService:
             if start_datetime and end_datetime and start_datetime >= end_datetime:
                 return {"success": False, "error": "Start time must be before end time"}
             
+            now = datetime.now(timezone.utc)
+            
             # Create main event record
             event = Event(
                 id=str(uuid.uuid4()),
@@ -97,10 +123,10 @@ class CalendarService:
                 event_type=event_type,
                 priority=priority,
                 location=location,
-                recurrence_rule=json.dumps(recurrence) if recurrence else None,
-                event_metadata=json.dumps(metadata) if metadata else None,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                recurrence_rule=recurrence or None,
+                event_metadata=metadata or None,
+                created_at=now,
+                updated_at=now
             )
             
             db.session.add(event)
@@ -113,7 +139,7 @@ class CalendarService:
                         event_id=event.id,
                         user_id=attendee_id,
                         status='pending',
-                        invited_at=datetime.utcnow()
+                        invited_at=now
                     )
                     db.session.add(attendee)
             
@@ -167,9 +193,6 @@ class CalendarService:
             Dictionary with events
         """
         try:
-            from app.models import User, Assignment
-            from app.models.calendar import Event, EventAttendee
-            
             # Set default date range if not provided
             if not start_date:
                 start_date = date.today() - timedelta(days=30)
@@ -177,8 +200,8 @@ class CalendarService:
                 end_date = date.today() + timedelta(days=90)
             
             # Convert dates to datetime for comparison
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
+            start_datetime = datetime.combine(start_date, datetime.min.time(), tzinfo=timezone.utc)
+            end_datetime = datetime.combine(end_date, datetime.max.time(), tzinfo=timezone.utc)
             
             events = []
             
@@ -200,7 +223,7 @@ class CalendarService:
             if event_types:
                 event_query = event_query.filter(Event.event_type.in_(event_types))
             
-            calendar_events = event_query.all()
+            calendar_events = event_query.order_by(Event.start_datetime).all()
             
             for event in calendar_events:
                 # Get attendee status for this user
@@ -215,30 +238,33 @@ class CalendarService:
                     "id": event.id,
                     "title": event.title,
                     "description": event.description,
-                    "start_datetime": event.start_datetime.isoformat(),
-                    "end_datetime": event.end_datetime.isoformat() if event.end_datetime else None,
+                    "start_datetime": _as_utc(event.start_datetime).isoformat(),
+                    "end_datetime": _as_utc(event.end_datetime).isoformat() if event.end_datetime else None,
                     "event_type": event.event_type,
                     "priority": event.priority,
                     "location": event.location,
                     "creator_id": event.creator_id,
                     "is_creator": event.creator_id == user_id,
                     "attendee_status": attendee_status,
-                    "recurrence_rule": json.loads(event.recurrence_rule) if event.recurrence_rule else None,
-                    "metadata": json.loads(event.event_metadata) if event.event_metadata else {}
+                    "recurrence_rule": event.recurrence_rule,
+                    "metadata": event.event_metadata or {}
                 }
                 events.append(event_data)
             
-            # Include assignment due dates if requested
+            # Include assignment due dates if requested; both lists come back
+            # ordered by start time, so a linear merge keeps them sorted.
+            # Merge on the parsed time rather than the string so that
+            # differing offsets still compare by instant
             if include_assignments:
                 user = User.query.get(user_id)
                 if user and user.role in ['student', 'teacher']:
                     assignment_events = CalendarService._get_assignment_events(
                         user_id, start_datetime, end_datetime, user.role
                     )
-                    events.extend(assignment_events)
-            
-            # Sort events by start time
-            events.sort(key=lambda x: x['start_datetime'])
+                    events = list(heapq.merge(
+                        events, assignment_events,
+                        key=lambda x: datetime.fromisoformat(x['start_datetime'])
+                    ))
             
             return {
                 "success": True,
@@ -255,8 +281,6 @@ class CalendarService:
     def update_event(event_id: str, user_id: int, **kwargs) -> Dict:
         """Update an existing event"""
         try:
-            from app.models.calendar import Event
-            
             event = Event.query.filter_by(id=event_id).first()
             if not event:
                 return {"success": False, "error": "Event not found"}
@@ -275,7 +299,7 @@ class CalendarService:
                 if field in kwargs:
                     setattr(event, field, kwargs[field])
             
-            event.updated_at = datetime.utcnow()
+            event.updated_at = datetime.now(timezone.utc)
             
             db.session.commit()
             
@@ -293,8 +317,6 @@ class CalendarService:
     def delete_event(event_id: str, user_id: int) -> Dict:
         """Delete an event"""
         try:
-            from app.models.calendar import Event
-            
             event = Event.query.filter_by(id=event_id).first()
             if not event:
                 return {"success": False, "error": "Event not found"}
@@ -316,8 +338,6 @@ class CalendarService:
     def add_attendee(event_id: str, attendee_user_id: int, inviter_user_id: int) -> Dict:
         """Add an attendee to an event"""
         try:
-            from app.models.calendar import Event, EventAttendee
-            
             # Check if event exists and user has permission to invite
             event = Event.query.filter_by(id=event_id).first()
             if not event:
@@ -326,31 +346,29 @@ class CalendarService:
             if event.creator_id != inviter_user_id:
                 return {"success": False, "error": "Permission denied"}
             
-            # Check if attendee is already invited
-            existing_attendee = EventAttendee.query.filter_by(
-                event_id=event_id,
-                user_id=attendee_user_id
-            ).first()
-            
-            if existing_attendee:
-                return {"success": False, "error": "User already invited to this event"}
-            
-            # Create new attendee
-            attendee = EventAttendee(
-                id=str(uuid.uuid4()),
+            # Insert atomically; the unique (event_id, user_id) key rejects
+            # duplicates, so no existence check is needed beforehand
+            stmt = _insert_ignoring_duplicates(
+                EventAttendee, ['event_id', 'user_id']
+            ).values(
                 event_id=event_id,
                 user_id=attendee_user_id,
                 status='pending',
-                invited_at=datetime.utcnow()
+                invited_at=datetime.now(timezone.utc)
             )
+            result = db.session.execute(stmt)
+            
+            if result.rowcount == 0:
+                db.session.rollback()
+                return {"success": False, "error": "User already invited to this event"}
             
-            db.session.add(attendee)
+            attendee_id = result.inserted_primary_key[0]
             db.session.commit()
             
             return {
                 "success": True,
-                "attendee_id": attendee.id,
-                "status": attendee.status
+                "attendee_id": attendee_id,
+                "status": 'pending'
             }
             
         except Exception as e:
@@ -361,28 +379,29 @@ class CalendarService:
     def respond_to_event(event_id: str, user_id: int, response: str) -> Dict:
         """Respond to an event invitation"""
         try:
-            from app.models.calendar import EventAttendee
+            if response not in _VALID_RESPONSES:
+                return {"success": False, "error": "Invalid response"}
             
-            attendee = EventAttendee.query.filter_by(
+            responded_at = datetime.now(timezone.utc)
+            
+            # Update by predicate; a zero row count means no invitation exists
+            rows = EventAttendee.query.filter_by(
                 event_id=event_id, user_id=user_id
-            ).first()
+            ).update(
+                {"status": response, "responded_at": responded_at},
+                synchronize_session=False
+            )
             
-            if not attendee:
+            if rows == 0:
+                db.session.rollback()
                 return {"success": False, "error": "Invitation not found"}
             
-            valid_responses = ['accepted', 'declined', 'tentative']
-            if response not in valid_responses:
-                return {"success": False, "error": "Invalid response"}
-            
-            attendee.status = response
-            attendee.responded_at = datetime.utcnow()
-            
             db.session.commit()
             
             return {
                 "success": True,
                 "response": response,
-                "responded_at": attendee.responded_at.isoformat()
+                "responded_at": responded_at.isoformat()
             }
             
         except Exception as e:
@@ -404,10 +423,10 @@ class CalendarService:
             
             if result["success"]:
                 # Filter to only future events
-                now = datetime.now()
+                now = datetime.now(timezone.utc)
                 upcoming_events = [
                     event for event in result["events"]
-                    if datetime.fromisoformat(event["start_datetime"]) > now
+                    if _as_utc(datetime.fromisoformat(event["start_datetime"])) > now
                 ]
                 
                 result["events"] = upcoming_events
@@ -423,8 +442,6 @@ class CalendarService:
                        minutes_before: int, user_id: int = None) -> Dict:
         """Create a reminder for an event"""
         try:
-            from app.models.calendar import EventReminder
-            
             reminder = EventReminder(
                 id=str(uuid.uuid4()),
                 event_id=event_id,
@@ -432,7 +449,7 @@ class CalendarService:
                 reminder_type=reminder_type,
                 minutes_before=minutes_before,
                 is_active=True,
-                created_at=datetime.utcnow()
+                created_at=datetime.now(timezone.utc)
             )
             
             db.session.add(reminder)
@@ -452,9 +469,7 @@ class CalendarService:
     def get_due_reminders() -> List[Dict]:
         """Get reminders that need to be sent"""
         try:
-            from app.models.calendar import EventReminder, Event
-            
-            now = datetime.utcnow()
+            now = datetime.now(timezone.utc)
             
             # Find reminders for events starting within the reminder window
             due_reminders = db.session.query(EventReminder, Event).join(
@@ -490,11 +505,9 @@ class CalendarService:
     def mark_reminder_sent(reminder_id: str) -> bool:
         """Mark a reminder as sent"""
         try:
-            from app.models.calendar import EventReminder
-            
             reminder = EventReminder.query.get(reminder_id)
             if reminder:
-                reminder.sent_at = datetime.utcnow()
+                reminder.sent_at = datetime.now(timezone.utc)
                 db.session.commit()
                 return True
             return False
@@ -507,17 +520,16 @@ class CalendarService:
     def get_calendar_analytics(user_id: int = None, timeframe: str = "30d") -> Dict:
         """Get calendar usage analytics"""
         try:
-            from app.models.calendar import Event, EventAttendee
-            
             # Calculate date range
             days_map = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}
             days = days_map.get(timeframe, 30)
-            start_date = datetime.utcnow() - timedelta(days=days)
+            now = datetime.now(timezone.utc)
+            start_date = now - timedelta(days=days)
             
             analytics = {
                 "timeframe": timeframe,
                 "start_date": start_date.isoformat(),
-                "end_date": datetime.utcnow().isoformat()
+                "end_date": now.isoformat()
             }
             
             if user_id:
@@ -572,8 +584,6 @@ class CalendarService:
     def _send_event_notifications(event, attendee_ids, notification_type):
         """Send notifications for event-related actions"""
         try:
-            from app.services.communication_service import CommunicationService
-            
             title = f"Event Invitation: {event.title}"
             message = f"You have been invited to '{event.title}' on {event.start_datetime.strftime('%Y-%m-%d %H:%M')}"
             
@@ -595,9 +605,8 @@ class CalendarService:
                               end_datetime: datetime, user_role: str) -> List[Dict]:
         """Get assignment due dates as calendar events"""
         try:
-            from app.models import Assignment, Submission, User
-            
             assignment_events = []
+            due_soon = datetime.now(timezone.utc) + timedelta(days=1)
             
             if user_role == 'student':
                 # Get assignments assigned to this student (through their grade/subjects)
@@ -607,7 +616,7 @@ class CalendarService:
                         Assignment.due_date <= end_datetime,
                         Assignment.is_active == True
                     )
-                ).all()
+                ).order_by(Assignment.due_date).all()
                 
                 for assignment in assignments:
                     # Check if student has submitted
@@ -617,15 +626,16 @@ class CalendarService:
                     ).first()
                     
                     status = "submitted" if submission and submission.status == "submitted" else "pending"
+                    due_date = _as_utc(assignment.due_date).isoformat()
                     
                     event_data = {
                         "id": f"assignment_{assignment.id}",
                         "title": f"Due: {assignment.title}",
                         "description": f"Assignment due for {assignment.subject}",
-                        "start_datetime": assignment.due_date.isoformat(),
-                        "end_datetime": assignment.due_date.isoformat(),
+                        "start_datetime": due_date,
+                        "end_datetime": due_date,
                         "event_type": "assignment",
-                        "priority": "high" if assignment.due_date <= datetime.utcnow() + timedelta(days=1) else "normal",
+                        "priority": "high" if _as_utc(assignment.due_date) <= due_soon else "normal",
                         "location": None,
                         "creator_id": assignment.teacher_id,
                         "is_creator": False,
@@ -648,20 +658,21 @@ class CalendarService:
                         Assignment.due_date <= end_datetime,
                         Assignment.is_active == True
                     )
-                ).all()
+                ).order_by(Assignment.due_date).all()
                 
                 for assignment in assignments:
                     # Count submissions
                     submission_count = Submission.query.filter_by(
                         assignment_id=assignment.id
                     ).count()
+                    due_date = _as_utc(assignment.due_date).isoformat()
                     
                     event_data = {
                         "id": f"assignment_{assignment.id}",
                         "title": f"Assignment Due: {assignment.title}",
                         "description": f"Assignment due date for {assignment.subject}",
-                        "start_datetime": assignment.due_date.isoformat(),
-                        "end_datetime": assignment.due_date.isoformat(),
+                        "start_datetime": due_date,
+                        "end_datetime": due_date,
                         "event_type": "assignment",
                         "priority": "normal",
                         "location": None,
@@ -686,8 +697,6 @@ class CalendarService:
     def _calculate_acceptance_rate(start_date: datetime) -> float:
         """Calculate event invitation acceptance rate"""
         try:
-            from app.models.calendar import EventAttendee
-            
             total_invitations = EventAttendee.query.filter(
                 EventAttendee.invited_at >= start_date
             ).count()
@@ -3,14 +3,41 @@ Communication Service for SACEL Platform
 Handles messaging, announcements, notifications, and discussion forums
 """
 
-from datetime import datetime, timedelta
-from sqlalchemy import and_, or_, desc, asc, func
+from datetime import datetime, timedelta, date
+from flask import current_app
+from sqlalchemy import and_, or_, desc, asc, func, case, bindparam, lambda_stmt, select
+from sqlalchemy.orm import raiseload
 from app.extensions import db
-import json
+from app.services.redis_service import redis_service
+import atexit
+import math
+import os
+import threading
+import time
 import uuid
 from enum import Enum
 from typing import List, Dict, Optional, Tuple
 
+# Background announcement fan-outs still running; joined at interpreter
+# exit so a clean shutdown does not cut a fan-out off halfway
+_fanout_threads = set()
+_fanout_threads_lock = threading.Lock()
+
+
+def _join_announcement_fanouts(timeout: float = 30):
+    """Wait up to timeout seconds for running announcement fan-outs"""
+    with _fanout_threads_lock:
+        threads = list(_fanout_threads)
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        thread.join(remaining)
+
+
+atexit.register(_join_announcement_fanouts)
+
 class MessageType(Enum):
     PERSONAL = "personal"
     ANNOUNCEMENT = "announcement"
@@ -62,51 +89,66 @@ class CommunicationService:
             if not sender:
                 return {"success": False, "error": "Sender not found"}
             
-            # Validate recipients exist
-            recipients = User.query.filter(User.id.in_(recipient_ids)).all()
-            if len(recipients) != len(recipient_ids):
+            # Validate recipients exist without loading the User rows
+            found_count = db.session.query(func.count(User.id)).filter(
+                User.id.in_(recipient_ids)
+            ).scalar()
+            if found_count != len(recipient_ids):
                 return {"success": False, "error": "One or more recipients not found"}
             
+            # One timestamp for the message, its recipients and notifications
+            now = datetime.utcnow()
+            
             # Create main message record
             message = Message(
-                id=str(uuid.uuid4()),
                 sender_id=sender_id,
+                sender_name=f"{sender.first_name} {sender.last_name}",
+                sender_role=sender.role.value if sender.role else None,
                 subject=subject,
                 content=content,
                 message_type=message_type,
                 priority=priority,
-                attachments=json.dumps(attachments) if attachments else None,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                attachments=attachments or None,
+                created_at=now,
+                updated_at=now
             )
             
             db.session.add(message)
             db.session.flush()  # Get the message ID
             
-            # Create recipient records
-            message_recipients = []
-            for recipient in recipients:
-                recipient_record = MessageRecipient(
-                    message_id=message.id,
-                    recipient_id=recipient.id,
-                    is_read=False,
-                    received_at=datetime.utcnow()
+            # Create recipient records in a single executemany INSERT
+            if recipient_ids:
+                db.session.execute(
+                    MessageRecipient.__table__.insert(),
+                    [
+                        {
+                            "message_id": message.id,
+                            "recipient_id": recipient_id,
+                            "is_read": False,
+                            "received_at": now
+                        }
+                        for recipient_id in recipient_ids
+                    ]
                 )
-                message_recipients.append(recipient_record)
-                db.session.add(recipient_record)
             
-            db.session.commit()
-            
-            # Send notifications for high priority messages
+            # Notify recipients of high priority messages in the same transaction
             if priority in ['high', 'urgent']:
                 CommunicationService._send_priority_notifications(
-                    message, recipients, sender
+                    message, recipient_ids, created_at=now
                 )
             
+            db.session.commit()
+            redis_service.invalidate_unread_counts(recipient_ids)
+            CommunicationService._invalidate_listing_totals(
+                inbox_user_ids=recipient_ids,
+                sender_id=sender_id,
+                notified_user_ids=recipient_ids if priority in ['high', 'urgent'] else ()
+            )
+            
             return {
                 "success": True,
                 "message_id": message.id,
-                "recipients_count": len(recipients),
+                "recipients_count": len(recipient_ids),
                 "sent_at": message.created_at.isoformat()
             }
             
@@ -116,7 +158,8 @@ class CommunicationService:
     
     @staticmethod
     def get_user_messages(user_id: int, folder: str = "inbox", 
-                         page: int = 1, per_page: int = 20) -> Dict:
+                         page: int = 1, per_page: int = 20,
+                         cursor: Optional[str] = None) -> Dict:
         """
         Get messages for a specific user
         
@@ -125,56 +168,89 @@ class CommunicationService:
             folder: Message folder (inbox, sent, drafts, archived)
             page: Page number for pagination
             per_page: Messages per page
+            cursor: Keyset cursor from a previous page; replaces page when given
             
         Returns:
             Dictionary with messages and pagination info
         """
         try:
-            from app.models import Message, MessageRecipient, User
+            from app.models import Message, MessageRecipient
+            
+            # Only the columns serialized below are selected, as plain rows
+            message_columns = (
+                Message.id, Message.subject, Message.content,
+                Message.message_type, Message.priority, Message.sender_id,
+                Message.sender_name, Message.sender_role,
+                Message.created_at, Message.attachments
+            )
+            received = folder not in ("sent", "drafts")
             
             if folder == "sent":
                 # Get sent messages
-                query = Message.query.filter_by(sender_id=user_id)
+                query = db.session.query(*message_columns).filter(
+                    Message.sender_id == user_id
+                )
             elif folder == "drafts":
                 # Get draft messages (not implemented in this version)
-                query = Message.query.filter_by(sender_id=user_id, is_draft=True)
+                query = db.session.query(*message_columns).filter(
+                    Message.sender_id == user_id, Message.is_draft == True
+                )
             elif folder == "archived":
-                # Get archived messages
-                query = (db.session.query(Message)
-                        .join(MessageRecipient)
+                # Get archived messages with this user's read state
+                query = (db.session.query(*message_columns,
+                                          MessageRecipient.is_read,
+                                          MessageRecipient.read_at)
+                        .join(MessageRecipient, MessageRecipient.message_id == Message.id)
                         .filter(and_(
                             MessageRecipient.recipient_id == user_id,
                             MessageRecipient.is_archived == True
                         )))
             else:  # inbox
-                # Get received messages
-                query = (db.session.query(Message)
-                        .join(MessageRecipient)
+                # Get received messages with this user's read state
+                query = (db.session.query(*message_columns,
+                                          MessageRecipient.is_read,
+                                          MessageRecipient.read_at)
+                        .join(MessageRecipient, MessageRecipient.message_id == Message.id)
                         .filter(and_(
                             MessageRecipient.recipient_id == user_id,
                             MessageRecipient.is_archived != True
                         )))
             
             # Order by creation date (newest first)
-            query = query.order_by(desc(Message.created_at))
+            query = query.order_by(desc(Message.created_at), desc(Message.id))
             
             # Paginate results
-            paginated = query.paginate(
-                page=page, per_page=per_page, error_out=False
+            rows, pagination = CommunicationService._paginate(
+                query, Message.created_at, Message.id, page, per_page, cursor,
+                count_key=f"messages:{user_id}:{folder}"
+            )
+            
+            if rows and pagination["has_next"]:
+                pagination["next_cursor"] = CommunicationService._encode_cursor(
+                    rows[-1].created_at, rows[-1].id
+                )
+            
+            # Sender details are stored on the message; only rows written
+            # before the snapshot columns existed need a lookup
+            senders = CommunicationService._get_user_summaries(
+                {message.sender_id for message in rows if message.sender_name is None}
             )
             
             messages = []
-            for message in paginated.items:
-                # Get sender info
-                sender = User.query.get(message.sender_id)
-                
-                # Get recipient info for this user
-                if folder != "sent":
-                    recipient_info = MessageRecipient.query.filter_by(
-                        message_id=message.id, recipient_id=user_id
-                    ).first()
+            for message in rows:
+                if message.sender_name is not None:
+                    sender = {
+                        "id": message.sender_id,
+                        "name": message.sender_name,
+                        "role": message.sender_role
+                    }
                 else:
-                    recipient_info = None
+                    summary = senders.get(message.sender_id)
+                    sender = {
+                        "id": summary.id,
+                        "name": f"{summary.first_name} {summary.last_name}",
+                        "role": summary.role.value if summary.role else None
+                    } if summary else None
                 
                 message_data = {
                     "id": message.id,
@@ -182,29 +258,18 @@ class CommunicationService:
                     "content": message.content,
                     "message_type": message.message_type,
                     "priority": message.priority,
-                    "sender": {
-                        "id": sender.id,
-                        "name": f"{sender.first_name} {sender.last_name}",
-                        "role": sender.role
-                    } if sender else None,
+                    "sender": sender,
                     "created_at": message.created_at.isoformat(),
-                    "is_read": recipient_info.is_read if recipient_info else True,
-                    "read_at": recipient_info.read_at.isoformat() if recipient_info and recipient_info.read_at else None,
-                    "attachments": json.loads(message.attachments) if message.attachments else []
+                    "is_read": message.is_read if received else True,
+                    "read_at": message.read_at.isoformat() if received and message.read_at else None,
+                    "attachments": message.attachments or []
                 }
                 messages.append(message_data)
             
             return {
                 "success": True,
                 "messages": messages,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total": paginated.total,
-                    "pages": paginated.pages,
-                    "has_next": paginated.has_next,
-                    "has_prev": paginated.has_prev
-                },
+                "pagination": pagination,
                 "unread_count": CommunicationService._get_unread_count(user_id)
             }
             
@@ -217,19 +282,29 @@ class CommunicationService:
         try:
             from app.models import MessageRecipient
             
-            recipient = MessageRecipient.query.filter_by(
+            # Flip the unread row in a single UPDATE; only a miss needs a
+            # second query to tell "already read" from "not found"
+            read_at = datetime.utcnow()
+            updated = MessageRecipient.query.filter_by(
+                message_id=message_id, recipient_id=user_id, is_read=False
+            ).update({"is_read": True, "read_at": read_at}, synchronize_session=False)
+            
+            if updated:
+                db.session.commit()
+                redis_service.invalidate_unread_counts([user_id])
+                return {"success": True, "read_at": read_at.isoformat()}
+            
+            recipient = db.session.query(MessageRecipient.read_at).filter_by(
                 message_id=message_id, recipient_id=user_id
             ).first()
             
             if not recipient:
                 return {"success": False, "error": "Message not found"}
             
-            if not recipient.is_read:
-                recipient.is_read = True
-                recipient.read_at = datetime.utcnow()
-                db.session.commit()
-            
-            return {"success": True, "read_at": recipient.read_at.isoformat()}
+            return {
+                "success": True,
+                "read_at": recipient.read_at.isoformat() if recipient.read_at else None
+            }
             
         except Exception as e:
             db.session.rollback()
@@ -254,41 +329,68 @@ class CommunicationService:
             Dictionary with creation results
         """
         try:
-            from app.models import User
-            
-            # Get users based on target audience
-            if "all" in target_audience:
-                recipients = User.query.all()
-            else:
-                recipients = User.query.filter(User.role.in_(target_audience)).all()
+            from app.models import User, Message
             
-            recipient_ids = [user.id for user in recipients]
+            sender = User.query.get(creator_id)
+            if not sender:
+                return {"success": False, "error": "Sender not found"}
             
-            # Send as announcement message
-            result = CommunicationService.send_message(
+            # Only the message row is written in the request; recipients are
+            # fanned out in batches afterwards
+            now = datetime.utcnow()
+            message = Message(
                 sender_id=creator_id,
-                recipient_ids=recipient_ids,
+                sender_name=f"{sender.first_name} {sender.last_name}",
+                sender_role=sender.role.value if sender.role else None,
                 subject=title,
                 content=content,
                 message_type="announcement",
-                priority=priority
+                priority=priority,
+                created_at=now,
+                updated_at=now
             )
+            db.session.add(message)
+            db.session.commit()
+            CommunicationService._invalidate_listing_totals(sender_id=creator_id)
             
-            if result["success"]:
-                # Store announcement metadata
-                announcement_data = {
-                    "message_id": result["message_id"],
-                    "target_audience": target_audience,
-                    "expiry_date": expiry_date.isoformat() if expiry_date else None,
-                    "created_at": result["sent_at"]
-                }
-                
-                # Could store in separate announcements table for better tracking
-                result["announcement_data"] = announcement_data
+            result = {
+                "success": True,
+                "message_id": message.id,
+                "sent_at": message.created_at.isoformat()
+            }
+            
+            if current_app.config.get('ANNOUNCEMENT_FANOUT_ASYNC'):
+                thread = threading.Thread(
+                    target=CommunicationService._run_announcement_fanout,
+                    args=(current_app._get_current_object(), message.id, target_audience),
+                    daemon=True
+                )
+                with _fanout_threads_lock:
+                    _fanout_threads.add(thread)
+                thread.start()
+                result["recipients_count"] = None
+                result["fanout"] = "queued"
+            else:
+                result["recipients_count"] = CommunicationService._fan_out_announcement(
+                    message.id, target_audience
+                )
+                result["fanout"] = "completed"
+            
+            # Store announcement metadata
+            announcement_data = {
+                "message_id": result["message_id"],
+                "target_audience": target_audience,
+                "expiry_date": expiry_date.isoformat() if expiry_date else None,
+                "created_at": result["sent_at"]
+            }
+            
+            # Could store in separate announcements table for better tracking
+            result["announcement_data"] = announcement_data
             
             return result
             
         except Exception as e:
+            db.session.rollback()
             return {"success": False, "error": str(e)}
     
     @staticmethod
@@ -316,21 +418,23 @@ class CommunicationService:
                 return {"success": False, "error": "User not found"}
             
             # Create forum post
+            now = datetime.utcnow()
             post = ForumPost(
-                id=str(uuid.uuid4()),
                 user_id=user_id,
                 category=category,
                 title=title,
                 content=content,
-                tags=json.dumps(tags) if tags else None,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
+                tags=tags or None,
+                created_at=now,
+                updated_at=now,
                 views=0,
                 likes=0
             )
             
             db.session.add(post)
             db.session.commit()
+            redis_service.invalidate_forum_posts()
+            redis_service.invalidate_listing_totals([f"forum:{category}", "forum:all"])
             
             return {
                 "success": True,
@@ -344,7 +448,8 @@ class CommunicationService:
     
     @staticmethod
     def get_forum_posts(category: str = None, page: int = 1, 
-                       per_page: int = 20, sort_by: str = "latest") -> Dict:
+                       per_page: int = 20, sort_by: str = "latest",
+                       cursor: Optional[str] = None) -> Dict:
         """
         Get forum posts with pagination and filtering
         
@@ -353,18 +458,30 @@ class CommunicationService:
             page: Page number
             per_page: Posts per page
             sort_by: Sort order (latest, popular, most_viewed)
+            cursor: Keyset cursor from a previous page (latest sort only)
             
         Returns:
             Dictionary with posts and pagination info
         """
         try:
-            from app.models import ForumPost, User
+            from app.models import ForumPost
+            
+            # Listings change on the order of minutes, so serve them from Redis
+            cache_key = f"{category or 'all'}:{sort_by}:{page}:{per_page}:{cursor or ''}"
+            cached_result = redis_service.get_forum_posts(cache_key)
+            if cached_result is not None:
+                return cached_result
             
-            # Build query
-            query = ForumPost.query
+            # Build query over just the serialized columns
+            query = db.session.query(
+                ForumPost.id, ForumPost.user_id, ForumPost.title,
+                ForumPost.content, ForumPost.category, ForumPost.tags,
+                ForumPost.created_at, ForumPost.updated_at,
+                ForumPost.views, ForumPost.likes
+            )
             
             if category:
-                query = query.filter_by(category=category)
+                query = query.filter(ForumPost.category == category)
             
             # Apply sorting
             if sort_by == "popular":
@@ -372,48 +489,63 @@ class CommunicationService:
             elif sort_by == "most_viewed":
                 query = query.order_by(desc(ForumPost.views))
             else:  # latest
-                query = query.order_by(desc(ForumPost.created_at))
+                query = query.order_by(desc(ForumPost.created_at), desc(ForumPost.id))
             
-            # Paginate
-            paginated = query.paginate(
-                page=page, per_page=per_page, error_out=False
+            # Paginate; only the latest ordering has a stable keyset
+            if sort_by not in ("popular", "most_viewed"):
+                items, pagination = CommunicationService._paginate(
+                    query, ForumPost.created_at, ForumPost.id, page, per_page, cursor,
+                    count_key=f"forum:{category or 'all'}"
+                )
+                if items and pagination["has_next"]:
+                    pagination["next_cursor"] = CommunicationService._encode_cursor(
+                        items[-1].created_at, items[-1].id
+                    )
+            else:
+                items, pagination = CommunicationService._paginate(
+                    query, None, None, page, per_page,
+                    count_key=f"forum:{category or 'all'}"
+                )
+            
+            # Load authors and reply counts for the whole page up front
+            authors = CommunicationService._get_user_summaries(
+                {post.user_id for post in items}
+            )
+            replies_counts = CommunicationService._get_replies_counts(
+                [post.id for post in items]
             )
             
             posts = []
-            for post in paginated.items:
-                author = User.query.get(post.user_id)
+            for post in items:
+                author = authors.get(post.user_id)
                 
                 post_data = {
                     "id": post.id,
                     "title": post.title,
                     "content": post.content[:200] + "..." if len(post.content) > 200 else post.content,
                     "category": post.category,
-                    "tags": json.loads(post.tags) if post.tags else [],
+                    "tags": post.tags or [],
                     "author": {
                         "id": author.id,
                         "name": f"{author.first_name} {author.last_name}",
-                        "role": author.role
+                        "role": author.role.value if author.role else None
                     } if author else None,
                     "created_at": post.created_at.isoformat(),
                     "updated_at": post.updated_at.isoformat(),
                     "views": post.views,
                     "likes": post.likes,
-                    "replies_count": CommunicationService._get_replies_count(post.id)
+                    "replies_count": replies_counts.get(post.id, 0)
                 }
                 posts.append(post_data)
             
-            return {
+            result = {
                 "success": True,
                 "posts": posts,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total": paginated.total,
-                    "pages": paginated.pages,
-                    "has_next": paginated.has_next,
-                    "has_prev": paginated.has_prev
-                }
+                "pagination": pagination
             }
+            redis_service.cache_forum_posts(cache_key, result)
+            
+            return result
             
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -435,29 +567,23 @@ class CommunicationService:
             Dictionary with notification results
         """
         try:
-            from app.models import Notification
-            
-            notifications = []
-            for user_id in user_ids:
-                notification = Notification(
-                    id=str(uuid.uuid4()),
-                    user_id=user_id,
-                    title=title,
-                    message=message,
-                    category=category,
-                    action_url=action_url,
-                    is_read=False,
-                    created_at=datetime.utcnow()
-                )
-                notifications.append(notification)
-                db.session.add(notification)
+            if not user_ids:
+                return {
+                    "success": True,
+                    "notifications_sent": 0,
+                    "sent_at": datetime.utcnow().isoformat()
+                }
             
+            created_at = CommunicationService._insert_notifications(
+                user_ids, title, message, category, action_url
+            )
             db.session.commit()
+            CommunicationService._invalidate_listing_totals(notified_user_ids=user_ids)
             
             return {
                 "success": True,
-                "notifications_sent": len(notifications),
-                "sent_at": datetime.utcnow().isoformat()
+                "notifications_sent": len(user_ids),
+                "sent_at": created_at.isoformat()
             }
             
         except Exception as e:
@@ -466,24 +592,35 @@ class CommunicationService:
     
     @staticmethod
     def get_user_notifications(user_id: int, unread_only: bool = False,
-                              page: int = 1, per_page: int = 20) -> Dict:
+                              page: int = 1, per_page: int = 20,
+                              cursor: Optional[str] = None) -> Dict:
         """Get notifications for a user"""
         try:
             from app.models import Notification
             
-            query = Notification.query.filter_by(user_id=user_id)
+            query = db.session.query(
+                Notification.id, Notification.title, Notification.message,
+                Notification.category, Notification.action_url,
+                Notification.is_read, Notification.created_at,
+                Notification.read_at
+            ).filter(Notification.user_id == user_id)
             
             if unread_only:
-                query = query.filter_by(is_read=False)
+                query = query.filter(Notification.is_read == False)
             
-            query = query.order_by(desc(Notification.created_at))
+            query = query.order_by(desc(Notification.created_at), desc(Notification.id))
             
-            paginated = query.paginate(
-                page=page, per_page=per_page, error_out=False
+            items, pagination = CommunicationService._paginate(
+                query, Notification.created_at, Notification.id, page, per_page, cursor,
+                count_key=f"notifications:{user_id}:{'unread' if unread_only else 'all'}"
             )
+            if items and pagination["has_next"]:
+                pagination["next_cursor"] = CommunicationService._encode_cursor(
+                    items[-1].created_at, items[-1].id
+                )
             
             notifications = []
-            for notification in paginated.items:
+            for notification in items:
                 notification_data = {
                     "id": notification.id,
                     "title": notification.title,
@@ -499,15 +636,8 @@ class CommunicationService:
             return {
                 "success": True,
                 "notifications": notifications,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total": paginated.total,
-                    "pages": paginated.pages
-                },
-                "unread_count": Notification.query.filter_by(
-                    user_id=user_id, is_read=False
-                ).count()
+                "pagination": pagination,
+                "unread_count": CommunicationService._get_unread_notification_count(user_id)
             }
             
         except Exception as e:
@@ -527,8 +657,6 @@ class CommunicationService:
             Dictionary with analytics data
         """
         try:
-            from app.models import Message, MessageRecipient, ForumPost, Notification
-            
             # Calculate date range
             days_map = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}
             days = days_map.get(timeframe, 30)
@@ -540,87 +668,513 @@ class CommunicationService:
                 "end_date": datetime.utcnow().isoformat()
             }
             
-            if user_id:
-                # Personal analytics
-                analytics.update({
-                    "messages_sent": Message.query.filter(
-                        and_(
-                            Message.sender_id == user_id,
-                            Message.created_at >= start_date
-                        )
-                    ).count(),
-                    "messages_received": MessageRecipient.query.filter(
-                        and_(
-                            MessageRecipient.recipient_id == user_id,
-                            MessageRecipient.received_at >= start_date
-                        )
-                    ).count(),
-                    "forum_posts": ForumPost.query.filter(
-                        and_(
-                            ForumPost.user_id == user_id,
-                            ForumPost.created_at >= start_date
-                        )
-                    ).count(),
-                    "notifications_received": Notification.query.filter(
-                        and_(
-                            Notification.user_id == user_id,
-                            Notification.created_at >= start_date
-                        )
-                    ).count()
-                })
+            if current_app.config.get('COMMUNICATION_ANALYTICS_ROLLUP'):
+                counts = CommunicationService._rollup_analytics_counts(user_id, start_date)
             else:
-                # System-wide analytics
-                analytics.update({
-                    "total_messages": Message.query.filter(
-                        Message.created_at >= start_date
-                    ).count(),
-                    "total_forum_posts": ForumPost.query.filter(
-                        ForumPost.created_at >= start_date
-                    ).count(),
-                    "total_notifications": Notification.query.filter(
-                        Notification.created_at >= start_date
-                    ).count(),
-                    "active_users": db.session.query(Message.sender_id).filter(
-                        Message.created_at >= start_date
-                    ).distinct().count()
-                })
+                counts = CommunicationService._live_analytics_counts(user_id, start_date)
+            
+            analytics.update(counts)
             
             return {"success": True, "analytics": analytics}
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @staticmethod
+    def refresh_analytics_rollup(days: int = 366) -> Dict:
+        """
+        Rebuild the daily communication counters for a trailing window
+        
+        The rows for the window are replaced inside one transaction, so
+        readers keep seeing the previous snapshot until the commit.
+        
+        Args:
+            days: Number of days back from today to recompute
+            
+        Returns:
+            Dictionary with refresh results
+        """
+        try:
+            from app.models import (
+                Message, MessageRecipient, ForumPost, Notification,
+                CommunicationDailyStat
+            )
+            
+            refreshed_at = datetime.utcnow()
+            start_day = refreshed_at.date() - timedelta(days=days)
+            start = datetime.combine(start_day, datetime.min.time())
+            
+            sources = {
+                "messages_sent": (Message.sender_id, Message.created_at),
+                "messages_received": (MessageRecipient.recipient_id, MessageRecipient.received_at),
+                "forum_posts": (ForumPost.user_id, ForumPost.created_at),
+                "notifications_received": (Notification.user_id, Notification.created_at)
+            }
+            
+            rows = {}
+            for counter, (user_column, time_column) in sources.items():
+                day_column = func.date(time_column)
+                grouped = (db.session.query(user_column, day_column, func.count())
+                           .filter(time_column >= start)
+                           .group_by(user_column, day_column))
+                
+                for row_user_id, day, count in grouped:
+                    # SQLite hands DATE() back as a string
+                    if isinstance(day, str):
+                        day = date.fromisoformat(day)
+                    row = rows.setdefault((row_user_id, day), {
+                        "user_id": row_user_id,
+                        "day": day,
+                        "messages_sent": 0,
+                        "messages_received": 0,
+                        "forum_posts": 0,
+                        "notifications_received": 0,
+                        "refreshed_at": refreshed_at
+                    })
+                    row[counter] = count
+            
+            CommunicationDailyStat.query.filter(
+                CommunicationDailyStat.day >= start_day
+            ).delete(synchronize_session=False)
+            if rows:
+                db.session.execute(
+                    CommunicationDailyStat.__table__.insert(), list(rows.values())
+                )
+            db.session.commit()
+            
+            return {
+                "success": True,
+                "rows_written": len(rows),
+                "start_date": start_day.isoformat(),
+                "refreshed_at": refreshed_at.isoformat()
+            }
+            
+        except Exception as e:
+            db.session.rollback()
+            return {"success": False, "error": str(e)}
+    
+    @staticmethod
+    def refresh_sender_snapshots(user_ids: Optional[List[int]] = None) -> Dict:
+        """
+        Rewrite the sender name/role stored on messages
+        
+        Run after users are renamed or change role, or with no arguments
+        to backfill every sender.
+        
+        Args:
+            user_ids: Senders to refresh (optional, defaults to all senders)
+            
+        Returns:
+            Dictionary with refresh results
+        """
+        try:
+            from app.models import User, Message
+            
+            senders = db.session.query(
+                User.id, User.first_name, User.last_name, User.role
+            ).filter(User.id.in_(
+                db.session.query(Message.sender_id).distinct()
+            ))
+            if user_ids is not None:
+                senders = senders.filter(User.id.in_(user_ids))
+            
+            rows = [
+                {
+                    "b_sender_id": sender.id,
+                    "b_sender_name": f"{sender.first_name} {sender.last_name}",
+                    "b_sender_role": sender.role.value if sender.role else None
+                }
+                for sender in senders
+            ]
+            
+            # One executemany UPDATE covering every sender
+            if rows:
+                messages = Message.__table__
+                db.session.execute(
+                    messages.update()
+                    .where(messages.c.sender_id == bindparam("b_sender_id"))
+                    .values(sender_name=bindparam("b_sender_name"),
+                            sender_role=bindparam("b_sender_role")),
+                    rows
+                )
+            db.session.commit()
+            
+            return {"success": True, "senders_refreshed": len(rows)}
+            
+        except Exception as e:
+            db.session.rollback()
+            return {"success": False, "error": str(e)}
+    
     # Helper methods
     @staticmethod
-    def _send_priority_notifications(message, recipients, sender):
-        """Send notifications for high priority messages"""
-        notification_title = f"High Priority Message from {sender.first_name} {sender.last_name}"
-        notification_message = f"Subject: {message.subject}"
+    def _run_announcement_fanout(app, message_id: str, target_audience: List[str]):
+        """Fan out an announcement from a background thread"""
+        with app.app_context():
+            try:
+                CommunicationService._fan_out_announcement(message_id, target_audience)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Announcement fan-out failed for {message_id}: {e}")
+            finally:
+                db.session.remove()
+                with _fanout_threads_lock:
+                    _fanout_threads.discard(threading.current_thread())
+    
+    @staticmethod
+    def _fan_out_announcement(message_id: str, target_audience: List[str],
+                              batch_size: int = 1000) -> int:
+        """
+        Deliver an announcement to its audience
+        
+        Normal announcements are delivered with one INSERT ... SELECT over
+        the users table, so no user ids are read into Python. Priority
+        announcements also need a notification per recipient, so their user
+        ids are read in primary-key order, batch_size at a time, and each
+        batch is inserted and committed on its own so memory stays flat
+        regardless of audience size.
+        
+        Returns:
+            Number of recipients the announcement was delivered to
+        """
+        from app.models import User, Message, MessageRecipient
+        
+        message = Message.query.get(message_id)
+        audience = db.session.query(User.id).order_by(User.id)
+        if "all" not in target_audience:
+            audience = audience.filter(User.role.in_(target_audience))
+        
+        if message.priority not in ['high', 'urgent']:
+            received_at = datetime.utcnow()
+            recipients = audience.order_by(None).with_entities(
+                bindparam("message_id", message_id, type_=MessageRecipient.message_id.type),
+                User.id,
+                bindparam("is_read", False, type_=MessageRecipient.is_read.type),
+                bindparam("received_at", received_at, type_=MessageRecipient.received_at.type)
+            )
+            result = db.session.execute(
+                MessageRecipient.__table__.insert().from_select(
+                    ["message_id", "recipient_id", "is_read", "received_at"],
+                    recipients.statement
+                )
+            )
+            db.session.commit()
+            redis_service.invalidate_all_unread_counts()
+            redis_service.invalidate_listing_totals_matching("messages:*:inbox")
+            return result.rowcount
+        
+        delivered = 0
+        last_id = 0
+        while True:
+            recipient_ids = [
+                row.id for row in audience.filter(User.id > last_id).limit(batch_size)
+            ]
+            if not recipient_ids:
+                break
+            
+            received_at = datetime.utcnow()
+            db.session.execute(
+                MessageRecipient.__table__.insert(),
+                [
+                    {
+                        "message_id": message_id,
+                        "recipient_id": recipient_id,
+                        "is_read": False,
+                        "received_at": received_at
+                    }
+                    for recipient_id in recipient_ids
+                ]
+            )
+            if message.priority in ['high', 'urgent']:
+                CommunicationService._send_priority_notifications(message, recipient_ids)
+            db.session.commit()
+            redis_service.invalidate_unread_counts(recipient_ids)
+            CommunicationService._invalidate_listing_totals(
+                inbox_user_ids=recipient_ids, notified_user_ids=recipient_ids
+            )
+            
+            delivered += len(recipient_ids)
+            last_id = recipient_ids[-1]
+        
+        return delivered
+    
+    @staticmethod
+    def _live_analytics_counts(user_id: Optional[int], start_date: datetime) -> Dict:
+        """Count communication activity directly from the source tables"""
+        from app.models import Message, MessageRecipient, ForumPost, Notification
+        
+        def count_since(column, *criteria):
+            return (db.session.query(func.count(column))
+                    .filter(*criteria)
+                    .scalar_subquery())
+        
+        # Every counter is a scalar subquery of one SELECT, so the
+        # whole report costs a single round-trip
+        if user_id:
+            # Personal analytics
+            counts = db.session.query(
+                count_since(
+                    Message.id,
+                    Message.sender_id == user_id,
+                    Message.created_at >= start_date
+                ).label("messages_sent"),
+                count_since(
+                    MessageRecipient.id,
+                    MessageRecipient.recipient_id == user_id,
+                    MessageRecipient.received_at >= start_date
+                ).label("messages_received"),
+                count_since(
+                    ForumPost.id,
+                    ForumPost.user_id == user_id,
+                    ForumPost.created_at >= start_date
+                ).label("forum_posts"),
+                count_since(
+                    Notification.id,
+                    Notification.user_id == user_id,
+                    Notification.created_at >= start_date
+                ).label("notifications_received")
+            ).one()
+        else:
+            # System-wide analytics
+            counts = db.session.query(
+                count_since(
+                    Message.id, Message.created_at >= start_date
+                ).label("total_messages"),
+                count_since(
+                    ForumPost.id, ForumPost.created_at >= start_date
+                ).label("total_forum_posts"),
+                count_since(
+                    Notification.id, Notification.created_at >= start_date
+                ).label("total_notifications"),
+                count_since(
+                    func.distinct(Message.sender_id),
+                    Message.created_at >= start_date
+                ).label("active_users")
+            ).one()
+        
+        return counts._asdict()
+    
+    @staticmethod
+    def _rollup_analytics_counts(user_id: Optional[int], start_date: datetime) -> Dict:
+        """Sum communication activity from the daily rollup table"""
+        from app.models import CommunicationDailyStat as Stat
+        
+        since = Stat.day >= start_date.date()
+        if user_id:
+            counts = db.session.query(
+                func.sum(Stat.messages_sent).label("messages_sent"),
+                func.sum(Stat.messages_received).label("messages_received"),
+                func.sum(Stat.forum_posts).label("forum_posts"),
+                func.sum(Stat.notifications_received).label("notifications_received")
+            ).filter(Stat.user_id == user_id, since).one()
+        else:
+            counts = db.session.query(
+                func.sum(Stat.messages_sent).label("total_messages"),
+                func.sum(Stat.forum_posts).label("total_forum_posts"),
+                func.sum(Stat.notifications_received).label("total_notifications"),
+                func.count(func.distinct(
+                    case((Stat.messages_sent > 0, Stat.user_id))
+                )).label("active_users")
+            ).filter(since).one()
+        
+        # SUM is NULL over no rows and a Decimal on MySQL
+        return {key: int(value or 0) for key, value in counts._asdict().items()}
+    
+    @staticmethod
+    def _invalidate_listing_totals(inbox_user_ids: List[int] = (),
+                                   sender_id: Optional[int] = None,
+                                   notified_user_ids: List[int] = ()):
+        """Drop the cached _paginate totals made stale by a committed write"""
+        count_keys = [f"messages:{user_id}:inbox" for user_id in inbox_user_ids]
+        if sender_id is not None:
+            count_keys.append(f"messages:{sender_id}:sent")
+        for user_id in notified_user_ids:
+            count_keys.append(f"notifications:{user_id}:all")
+            count_keys.append(f"notifications:{user_id}:unread")
+        redis_service.invalidate_listing_totals(count_keys)
+    
+    @staticmethod
+    def _paginate(query, created_column, id_column, page: int, per_page: int,
+                  cursor: Optional[str] = None,
+                  count_key: Optional[str] = None) -> Tuple[List, Dict]:
+        """
+        Fetch one page of a newest-first query
+        
+        Without a cursor this is regular offset pagination; the total comes
+        from Redis under count_key when cached, so the COUNT(*) runs at most
+        once per TTL. With a cursor the page is read by seeking past the
+        last (created_at, id) pair, which skips both the OFFSET scan and the
+        COUNT(*) for total.
+        """
+        query = CommunicationService._raise_on_lazy_load(query)
+        
+        if not cursor:
+            page = max(page, 1)
+            items = query.limit(per_page).offset((page - 1) * per_page).all()
+            
+            total = redis_service.get_listing_total(count_key) if count_key else None
+            if total is None:
+                total = query.order_by(None).count()
+                if count_key:
+                    redis_service.cache_listing_total(count_key, total)
+            
+            pages = math.ceil(total / per_page) if per_page else 0
+            return items, {
+                "page": page,
+                "per_page": per_page,
+                "total": total,
+                "pages": pages,
+                "has_next": page < pages,
+                "has_prev": page > 1,
+                "next_cursor": None
+            }
+        
+        last_created_at, last_id = CommunicationService._decode_cursor(cursor)
+        items = query.filter(or_(
+            created_column < last_created_at,
+            and_(created_column == last_created_at, id_column < last_id)
+        )).limit(per_page + 1).all()
+        
+        has_next = len(items) > per_page
+        return items[:per_page], {
+            "per_page": per_page,
+            "has_next": has_next,
+            "next_cursor": None
+        }
+    
+    @staticmethod
+    def _raise_on_lazy_load(query):
+        """
+        In debug mode, make lazy relationship loads on listed entities raise
         
-        user_ids = [recipient.id for recipient in recipients]
-        CommunicationService.send_notification(
-            user_ids=user_ids,
-            title=notification_title,
-            message=notification_message,
-            category="urgent"
+        Listings select plain columns and batch-load related rows, so a lazy
+        load here is an N+1 regression. Column-only queries have no
+        relationships to guard and are returned unchanged.
+        """
+        if not current_app.config.get('DEBUG'):
+            return query
+        if not any(column["expr"] is column["entity"]
+                   for column in query.column_descriptions):
+            return query
+        return query.options(raiseload("*"))
+    
+    @staticmethod
+    def _encode_cursor(created_at: datetime, row_id) -> str:
+        """Build a keyset cursor from the last row of a page"""
+        return f"{created_at.isoformat()}|{row_id}"
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        """Split a keyset cursor back into its (created_at, id) pair"""
+        created_at, separator, row_id = cursor.partition("|")
+        if not separator or not row_id:
+            raise ValueError("Invalid pagination cursor")
+        return datetime.fromisoformat(created_at), row_id
+    
+    @staticmethod
+    def _send_priority_notifications(message, recipient_ids,
+                                     created_at: datetime = None):
+        """Queue notifications for high priority messages; the caller commits"""
+        if not recipient_ids:
+            return
+        CommunicationService._insert_notifications(
+            recipient_ids,
+            title=f"High Priority Message from {message.sender_name}",
+            message=f"Subject: {message.subject}",
+            category="urgent",
+            created_at=created_at
+        )
+    
+    @staticmethod
+    def _insert_notifications(user_ids: List[int], title: str, message: str,
+                              category: str, action_url: str = None,
+                              created_at: datetime = None) -> datetime:
+        """Insert one notification per user in a single executemany INSERT"""
+        from app.models import Notification
+        
+        created_at = created_at or datetime.utcnow()
+        notification_ids = CommunicationService._generate_uuids(len(user_ids))
+        db.session.execute(
+            Notification.__table__.insert(),
+            [
+                {
+                    "id": notification_id,
+                    "user_id": user_id,
+                    "title": title,
+                    "message": message,
+                    "category": category,
+                    "action_url": action_url,
+                    "is_read": False,
+                    "created_at": created_at
+                }
+                for notification_id, user_id in zip(notification_ids, user_ids)
+            ]
         )
+        return created_at
     
     @staticmethod
     def _get_unread_count(user_id: int) -> int:
-        """Get unread message count for a user"""
+        """Get unread message count for a user, cached briefly in Redis"""
+        cached_count = redis_service.get_unread_count(user_id)
+        if cached_count is not None:
+            return cached_count
+        
         try:
             from app.models import MessageRecipient
-            return MessageRecipient.query.filter_by(
-                recipient_id=user_id, is_read=False
-            ).count()
+            count = db.session.execute(lambda_stmt(
+                lambda: select(func.count(MessageRecipient.id)).where(
+                    MessageRecipient.recipient_id == user_id,
+                    MessageRecipient.is_read == False
+                )
+            )).scalar()
         except:
             return 0
+        
+        redis_service.cache_unread_count(user_id, count)
+        return count
+    
+    @staticmethod
+    def _get_unread_notification_count(user_id: int) -> int:
+        """Count a user's unread notifications with a cached lambda statement"""
+        from app.models import Notification
+        return db.session.execute(lambda_stmt(
+            lambda: select(func.count(Notification.id)).where(
+                Notification.user_id == user_id,
+                Notification.is_read == False
+            )
+        )).scalar()
     
     @staticmethod
-    def _get_replies_count(post_id: str) -> int:
-        """Get reply count for a forum post"""
+    def _generate_uuids(count: int) -> List[str]:
+        """Generate UUID4 strings from a single os.urandom read"""
+        random_bytes = os.urandom(16 * count)
+        return [
+            str(uuid.UUID(bytes=random_bytes[offset:offset + 16], version=4))
+            for offset in range(0, 16 * count, 16)
+        ]
+    
+    @staticmethod
+    def _get_user_summaries(user_ids) -> Dict[int, Tuple]:
+        """Load id/name/role rows for the given users, keyed by id"""
+        if not user_ids:
+            return {}
+        from app.models import User
+        rows = db.session.query(
+            User.id, User.first_name, User.last_name, User.role
+        ).filter(User.id.in_(user_ids))
+        return {row.id: row for row in rows}
+    
+    @staticmethod
+    def _get_replies_counts(post_ids: List[str]) -> Dict[str, int]:
+        """Get reply counts for several forum posts in one grouped query"""
+        if not post_ids:
+            return {}
         try:
             from app.models import ForumReply
-            return ForumReply.query.filter_by(post_id=post_id).count()
+            return dict(
+                db.session.query(ForumReply.post_id, func.count(ForumReply.id))
+                .filter(ForumReply.post_id.in_(post_ids))
+                .group_by(ForumReply.post_id)
+                .all()
+            )
         except:
-            return 0
\ No newline at end of file
+            return {}
\ No newline at end of file
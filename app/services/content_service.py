@@ -3,6 +3,10 @@ Template content localization for SACEL Platform
 Provides localized strings for templates and UI components
 """
 
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+
 # Page titles and headings
 PAGE_CONTENT = {
     'en': {
@@ -366,12 +370,67 @@ PAGE_CONTENT = {
 }
 
 
+# Intern every key and value so strings repeated across languages are
+# shared and key comparisons during lookups can short-circuit on identity
+PAGE_CONTENT = {
+    sys.intern(language): {
+        sys.intern(key): sys.intern(value) for key, value in content.items()
+    }
+    for language, content in PAGE_CONTENT.items()
+}
+
+_EN_CONTENT = PAGE_CONTENT['en']
+
+
+@lru_cache(maxsize=16)
+def _resolved_content(language):
+    """
+    Build a language's content with missing keys backfilled from English
+    
+    Built on first use, so a worker only holds copies for the languages it
+    actually serves. Unknown languages resolve to English.
+    """
+    content = PAGE_CONTENT.get(language)
+    if content is None:
+        return _EN_CONTENT
+    return {**_EN_CONTENT, **content}
+
+
+@lru_cache(maxsize=512)
+def content_fallback(key):
+    """Get the text shown for a key that has no content, e.g. 'nav_home' -> 'Nav Home'"""
+    return key.title().replace('_', ' ')
+
+
+@lru_cache(maxsize=512)
 def get_content(key, language='en'):
-    """Get localized content string"""
-    content = PAGE_CONTENT.get(language, PAGE_CONTENT['en'])
-    return content.get(key, PAGE_CONTENT['en'].get(key, key.title().replace('_', ' ')))
+    """
+    Get localized content string
+    
+    Content is static after import, so results are cached for the life of
+    the process.
+    """
+    value = _resolved_content(language).get(key)
+    if value is None:
+        value = content_fallback(key)
+    return value
 
 
+def get_many(keys, language='en'):
+    """Get several localized content strings at once, keyed by content key"""
+    content = _resolved_content(language)
+    return {
+        key: content[key] if key in content else content_fallback(key)
+        for key in keys
+    }
+
+
+@lru_cache(maxsize=16)
 def get_all_content(language='en'):
-    """Get all content for a specific language"""
-    return PAGE_CONTENT.get(language, PAGE_CONTENT['en'])
\ No newline at end of file
+    """
+    Get all content for a specific language
+    
+    The result is a read-only view shared by every caller; read it directly
+    rather than copying it, and use dict() only if a mutable copy is needed.
+    """
+    return MappingProxyType(_resolved_content(language))
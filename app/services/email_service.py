@@ -3,28 +3,261 @@ Email Service for SACEL Platform
 Handles all email notifications including assignments, grades, and system alerts
 """
 
+import atexit
+import base64
+import hashlib
+import io
 import os
+import queue
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from types import MappingProxyType
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
-from email import encoders
+from email.header import Header
+from email.utils import formataddr
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from flask import current_app, render_template_string
-from jinja2 import Template
+from jinja2 import (
+    BaseLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, ModuleLoader,
+    select_autoescape
+)
+
+EMAIL_TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'templates', 'emails'
+)
+COMPILED_EMAIL_TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'templates', 'emails_compiled'
+)
+
+
+class _MinifyingLoader(BaseLoader):
+    """Strip indentation and blank lines from template sources as they load"""
+    
+    def __init__(self, loader):
+        self.loader = loader
+    
+    def get_source(self, environment, template):
+        source, filename, uptodate = self.loader.get_source(environment, template)
+        lines = (line.strip() for line in source.splitlines())
+        return '\n'.join(line for line in lines if line), filename, uptodate
+    
+    def list_templates(self):
+        return self.loader.list_templates()
+
+
+def email_template_loader() -> BaseLoader:
+    """Load email template sources, minified, from EMAIL_TEMPLATE_DIR"""
+    return _MinifyingLoader(FileSystemLoader(EMAIL_TEMPLATE_DIR))
+
+
+def email_environment(loader, bytecode_cache=None) -> Environment:
+    """Build the Jinja2 environment used for email bodies"""
+    return Environment(
+        loader=loader,
+        autoescape=select_autoescape(['html']),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False
+    )
+
+
+# Email bodies live in app/templates/emails. Deployments that ran
+# scripts/compile_email_templates.py load them precompiled; otherwise they
+# are compiled on first load with the bytecode cached on disk across restarts
+if os.path.isdir(COMPILED_EMAIL_TEMPLATE_DIR):
+    _env = email_environment(ModuleLoader(COMPILED_EMAIL_TEMPLATE_DIR))
+else:
+    _env = email_environment(
+        email_template_loader(), bytecode_cache=FileSystemBytecodeCache()
+    )
+
+_ASSIGNMENT_TEMPLATE = _env.get_template('assignment.html')
+_GRADE_TEMPLATE = _env.get_template('grade.html')
+_ADMISSION_TEMPLATE = _env.get_template('admission.html')
+_ANNOUNCEMENT_TEMPLATE = _env.get_template('announcement.html')
+_SUBMISSION_TEMPLATE = _env.get_template('submission.html')
+_GRADING_REMINDER_TEMPLATE = _env.get_template('grading_reminder.html')
+_WELCOME_TEMPLATE = _env.get_template('welcome.html')
+
+# SMTP and delivery settings, read from the environment once at import
+_SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+_SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+_SMTP_USERNAME = os.getenv('SMTP_USERNAME', '')
+_SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
+_FROM_EMAIL = os.getenv('FROM_EMAIL', 'noreply@sacel.org.za')
+_FROM_NAME = os.getenv('FROM_NAME', 'SACEL Platform')
+_SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '5'))
+_SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+_EMAIL_QUEUE_SIZE = int(os.getenv('EMAIL_QUEUE_SIZE', '10000'))
+_EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', '4'))
+_EMAIL_DEDUP_SECONDS = int(os.getenv('EMAIL_DEDUP_SECONDS', '60'))
+
+# Attachments are read in 64 KB chunks; 57 bytes encode to one base64 line
+_ATTACHMENT_CHUNK_SIZE = 57 * 1150
+
+# Header colours and icons for admission statuses and announcement priorities
+_STATUS_COLORS = MappingProxyType({
+    'accepted': '#059669',
+    'rejected': '#dc2626',
+    'pending': '#d97706',
+    'waitlisted': '#7c3aed'
+})
+
+_STATUS_ICONS = MappingProxyType({
+    'accepted': '🎉',
+    'rejected': '😔',
+    'pending': '⏳',
+    'waitlisted': '📝'
+})
+
+_PRIORITY_COLORS = MappingProxyType({
+    'low': '#6b7280',
+    'normal': '#2563eb',
+    'high': '#d97706',
+    'urgent': '#dc2626'
+})
+
+_PRIORITY_ICONS = MappingProxyType({
+    'low': '📢',
+    'normal': '📢',
+    'high': '⚠️',
+    'urgent': '🚨'
+})
+
+
+class _PooledConnection:
+    """An SMTP session checked out of an SMTPPool"""
+    
+    def __init__(self, server):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+    
+    def send_message(self, msg):
+        self.sent += 1
+        return self.server.send_message(msg)
+    
+    def sendmail(self, from_addr, to_addrs, msg):
+        self.sent += 1
+        return self.server.sendmail(from_addr, to_addrs, msg)
+
+
+class SMTPPool:
+    """
+    Bounded pool of authenticated SMTP connections
+    
+    At most max_size sessions are open at once. A session is retired with
+    QUIT after max_messages_per_conn messages to stay within provider
+    per-connection limits, and one idle for longer than idle_check_seconds
+    is checked with NOOP before reuse.
+    """
+    
+    def __init__(self, connect, max_size: int = 5, max_messages_per_conn: int = 100,
+                 idle_check_seconds: int = 30):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.max_size = max_size
+        self.max_messages_per_conn = max_messages_per_conn
+        self.idle_check_seconds = idle_check_seconds
+    
+    @contextmanager
+    def acquire(self):
+        """Check out a connection, yielding None if no connection could be made"""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except (smtplib.SMTPServerDisconnected, OSError):
+            if conn is not None:
+                self._quit(conn.server)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._release(conn)
+            self._slots.release()
+    
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(conn.server)
+    
+    def _checkout(self) -> Optional[_PooledConnection]:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - conn.last_used < self.idle_check_seconds:
+                return conn
+            try:
+                conn.server.noop()
+                return conn
+            except (smtplib.SMTPException, OSError):
+                self._quit(conn.server)
+        
+        server = self._connect()
+        return _PooledConnection(server) if server else None
+    
+    def _release(self, conn: _PooledConnection):
+        if conn.sent >= self.max_messages_per_conn:
+            self._quit(conn.server)
+            return
+        conn.last_used = time.monotonic()
+        self._idle.put_nowait(conn)
+    
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
 
 
 class EmailService:
     """Comprehensive email service for educational platform notifications"""
     
     def __init__(self):
-        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-        self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
-        self.smtp_username = os.getenv('SMTP_USERNAME', '')
-        self.smtp_password = os.getenv('SMTP_PASSWORD', '')
-        self.from_email = os.getenv('FROM_EMAIL', 'noreply@sacel.org.za')
-        self.from_name = os.getenv('FROM_NAME', 'SACEL Platform')
+        self.smtp_server = _SMTP_SERVER
+        self.smtp_port = _SMTP_PORT
+        self.smtp_username = _SMTP_USERNAME
+        self.smtp_password = _SMTP_PASSWORD
+        self.from_email = _FROM_EMAIL
+        self.from_name = _FROM_NAME
+        self._from_header = formataddr((self.from_name, self.from_email))
+        
+        # Authenticated SMTP sessions are pooled and reused across sends
+        self._pool = SMTPPool(
+            self._create_connection,
+            max_size=_SMTP_POOL_SIZE,
+            max_messages_per_conn=_SMTP_MAX_MESSAGES_PER_CONNECTION
+        )
+        atexit.register(self._pool.close_all)
+        
+        # Sends queued off the request thread, drained by worker threads
+        # that are started on first use
+        self._queue = queue.Queue(maxsize=_EMAIL_QUEUE_SIZE)
+        self._worker_count = _EMAIL_WORKERS
+        self._workers = []
+        self._workers_lock = threading.Lock()
+        atexit.register(self._drain_queue)
+        
+        # Digests of recently sent emails, so an identical email sent again
+        # within the dedup window is dropped
+        self._recent_sends: Dict[bytes, float] = {}
+        self._recent_sends_lock = threading.Lock()
         
     def _create_connection(self):
         """Create SMTP connection"""
@@ -37,49 +270,359 @@ class EmailService:
             current_app.logger.error(f"Failed to connect to SMTP server: {e}")
             return None
     
-    def _send_email(self, to_emails: List[str], subject: str, 
+    def _build_message(self, to_emails: List[str], subject: str,
+                       html_content: str, text_content: str = None,
+                       attachments: List[Dict] = None) -> MIMEBase:
+        """Build a MIME message with optional text part and attachments"""
+        # HTML-only mail is a single text/html part with no multipart wrapper
+        msg = (MIMEMultipart('alternative') if text_content or attachments
+               else MIMEText(html_content, 'html', 'utf-8'))
+        msg['From'] = self._from_header
+        msg['To'] = to_emails[0] if len(to_emails) == 1 else ', '.join(to_emails)
+        msg['Subject'] = subject
+        
+        if not text_content and not attachments:
+            return msg
+        
+        # Add text version if provided
+        if text_content:
+            text_part = MIMEText(text_content, 'plain')
+            msg.attach(text_part)
+        
+        # Add HTML version
+        html_part = MIMEText(html_content, 'html')
+        msg.attach(html_part)
+        
+        # Add attachments if provided
+        if attachments:
+            for attachment in attachments:
+                part = self._encode_attachment(attachment['path'])
+                part.add_header(
+                    'Content-Disposition',
+                    f'attachment; filename= {attachment["filename"]}'
+                )
+                msg.attach(part)
+        
+        return msg
+    
+    @staticmethod
+    def _encode_attachment(path: str) -> MIMEBase:
+        """
+        Base64-encode a file into a MIME part, reading it in chunks
+        
+        Chunks are a multiple of 57 bytes, the input size of one 76
+        character base64 line, so encoding them one at a time gives the
+        same output as encoding the whole file. Only the encoded payload is
+        held in memory, never the raw file as well.
+        """
+        encoded = io.StringIO()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(_ATTACHMENT_CHUNK_SIZE), b''):
+                encoded.write(base64.encodebytes(chunk).decode('ascii'))
+        
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(encoded.getvalue())
+        part['Content-Transfer-Encoding'] = 'base64'
+        return part
+    
+    def _html_message_parts(self, subject: str, html_content: str) -> Tuple[bytes, bytes]:
+        """
+        Format an HTML-only message as bytes around its To: header value
+        
+        Returns (prefix, suffix) so a message for any ASCII recipient list
+        is prefix + to_header + suffix, without building email.mime objects.
+        Lines end in CRLF and the body is base64 encoded, so smtplib sends
+        the bytes as they are. Only a non-ASCII subject is RFC 2047 encoded.
+        """
+        if subject.isascii() and '\r' not in subject and '\n' not in subject:
+            subject_header = subject.encode('ascii')
+        else:
+            subject_header = Header(subject, 'utf-8').encode().encode('ascii')
+        body = base64.encodebytes(html_content.encode('utf-8')).replace(b'\n', b'\r\n')
+        
+        prefix = b"From: %s\r\nTo: " % self._from_header.encode('ascii')
+        suffix = (
+            b"\r\nSubject: %s\r\n"
+            b"MIME-Version: 1.0\r\n"
+            b'Content-Type: text/html; charset="utf-8"\r\n'
+            b"Content-Transfer-Encoding: base64\r\n"
+            b"\r\n"
+            b"%s"
+        ) % (subject_header, body)
+        return prefix, suffix
+    
+    def _send_email(self, to_emails: List[str], subject: str,
                    html_content: str, text_content: str = None,
                    attachments: List[Dict] = None) -> bool:
-        """Send email with optional attachments"""
+        """Send email with optional attachments, queued when EMAIL_SEND_ASYNC is on"""
+        key = None if attachments else self._dedup_key(to_emails, subject, html_content)
+        return self._dispatch(
+            self._deliver_email, to_emails, subject, html_content, text_content, attachments,
+            dedup_key=key
+        )
+    
+    def _send_email_bulk(self, recipients: List[str], subject: str,
+                         html_content: str, text_content: str = None) -> bool:
+        """Send one copy per recipient, queued when EMAIL_SEND_ASYNC is on"""
+        key = self._dedup_key(recipients, subject, html_content)
+        return self._dispatch(
+            self._deliver_email_bulk, recipients, subject, html_content, text_content,
+            dedup_key=key
+        )
+    
+    @staticmethod
+    def _dedup_key(to_emails: List[str], subject: str, html_content: str) -> Optional[bytes]:
+        """Digest identifying an email for deduplication, or None when it is off"""
+        if _EMAIL_DEDUP_SECONDS <= 0:
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update('\0'.join(to_emails).encode('utf-8'))
+        digest.update(b'\0' + subject.encode('utf-8') + b'\0')
+        digest.update(html_content.encode('utf-8'))
+        return digest.digest()
+    
+    def _is_duplicate(self, key: bytes) -> bool:
+        """
+        Record a send, returning True if the same email went to the same
+        recipients within the last EMAIL_DEDUP_SECONDS
+        
+        Entries are kept oldest first, so expired ones are dropped from the
+        front; at most 10,000 are kept.
+        """
+        now = time.monotonic()
+        with self._recent_sends_lock:
+            recent = self._recent_sends
+            sent_at = recent.get(key)
+            if sent_at is not None and now - sent_at < _EMAIL_DEDUP_SECONDS:
+                return True
+            recent.pop(key, None)
+            recent[key] = now
+            
+            for oldest, oldest_at in list(islice(recent.items(), 100)):
+                if len(recent) <= 10000 and now - oldest_at < _EMAIL_DEDUP_SECONDS:
+                    break
+                del recent[oldest]
+        return False
+    
+    def _forget_send(self, key: bytes):
+        """Drop a failed send from the dedup table so it can be retried"""
+        with self._recent_sends_lock:
+            self._recent_sends.pop(key, None)
+    
+    def _dispatch(self, deliver, *args, dedup_key: Optional[bytes] = None) -> bool:
+        """
+        Run a delivery now, or queue it for the worker threads
+        
+        Returns True once a queued delivery is accepted; the SMTP outcome
+        is only logged. A full queue falls back to sending synchronously.
+        A send matching dedup_key within EMAIL_DEDUP_SECONDS is skipped;
+        the key is released again if its delivery fails.
+        """
+        if not current_app.config.get('EMAIL_SEND_ASYNC'):
+            if dedup_key and self._is_duplicate(dedup_key):
+                return True
+            return self._deliver_and_release(dedup_key, deliver, *args)
+        
+        # With the redis backend, jobs go to scripts/run_email_worker.py
+        # processes, which release the key in Redis when delivery fails;
+        # if Redis is unreachable jobs stay in-process
+        if current_app.config.get('EMAIL_QUEUE_BACKEND') == 'redis':
+            from app.services.redis_service import redis_service
+            redis_key = dedup_key.hex() if dedup_key else None
+            if redis_key and redis_service.claim_email_send(redis_key, _EMAIL_DEDUP_SECONDS) is False:
+                return True
+            job = {'deliver': deliver.__name__, 'args': list(args), 'attempts': 0,
+                   'dedup_key': redis_key}
+            if redis_service.enqueue_email_job(job):
+                return True
+            if redis_key:
+                redis_service.release_email_send(redis_key)
+            current_app.logger.warning("Email job could not be queued in Redis; using worker threads")
+        
+        if dedup_key and self._is_duplicate(dedup_key):
+            return True
+        self._start_workers()
+        try:
+            self._queue.put_nowait((current_app._get_current_object(), deliver, args, dedup_key))
+            return True
+        except queue.Full:
+            current_app.logger.warning("Email queue is full; sending synchronously")
+            return self._deliver_and_release(dedup_key, deliver, *args)
+    
+    def _deliver_and_release(self, dedup_key: Optional[bytes], deliver, *args) -> bool:
+        """Run a delivery, dropping its dedup entry unless it succeeds"""
+        sent = False
+        try:
+            sent = deliver(*args)
+            return sent
+        finally:
+            if dedup_key and not sent:
+                self._forget_send(dedup_key)
+    
+    def _start_workers(self):
+        """Start the queue worker threads if they are not running"""
+        if self._workers:
+            return
+        with self._workers_lock:
+            if self._workers:
+                return
+            for index in range(self._worker_count):
+                worker = threading.Thread(
+                    target=self._run_worker, name=f"email-worker-{index}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+    
+    def _run_worker(self):
+        """Deliver queued emails inside the queuing app's context"""
+        while True:
+            app, deliver, args, dedup_key = self._queue.get()
+            try:
+                with app.app_context():
+                    self._deliver_and_release(dedup_key, deliver, *args)
+            except Exception as e:
+                app.logger.error(f"Queued email delivery failed: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def run_queued_job(self, job: Dict[str, Any]) -> bool:
+        """Deliver a job taken from the Redis email queue"""
+        if job['deliver'] not in ('_deliver_email', '_deliver_email_bulk'):
+            current_app.logger.error(f"Unknown email job: {job['deliver']}")
+            return False
+        return getattr(self, job['deliver'])(*job['args'])
+    
+    def _drain_queue(self, timeout: float = 30):
+        """Wait up to timeout seconds for queued emails to be delivered"""
+        if not self._workers:
+            return
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._queue.all_tasks_done.wait(remaining)
+    
+    def _deliver_email(self, to_emails: List[str], subject: str,
+                       html_content: str, text_content: str = None,
+                       attachments: List[Dict] = None) -> bool:
+        """Send email with optional attachments on the current thread"""
         try:
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = ', '.join(to_emails)
-            msg['Subject'] = subject
+            # HTML-only mail is formatted directly; anything else goes
+            # through the email.mime builder
+            if not text_content and not attachments and all(
+                email.isascii() for email in to_emails
+            ):
+                prefix, suffix = self._html_message_parts(subject, html_content)
+                to_header = to_emails[0] if len(to_emails) == 1 else ', '.join(to_emails)
+                raw_msg = prefix + to_header.encode('ascii') + suffix
+                
+                with self._pool.acquire() as conn:
+                    if conn:
+                        conn.sendmail(self.from_email, to_emails, raw_msg)
+                        return True
+                return False
             
-            # Add text version if provided
-            if text_content:
-                text_part = MIMEText(text_content, 'plain')
-                msg.attach(text_part)
+            msg = self._build_message(
+                to_emails, subject, html_content, text_content, attachments
+            )
             
-            # Add HTML version
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
+            # Send email over a pooled connection
+            with self._pool.acquire() as conn:
+                if conn:
+                    conn.send_message(msg)
+                    return True
+            return False
             
-            # Add attachments if provided
-            if attachments:
-                for attachment in attachments:
-                    with open(attachment['path'], 'rb') as file:
-                        part = MIMEBase('application', 'octet-stream')
-                        part.set_payload(file.read())
+        except Exception as e:
+            current_app.logger.error(f"Failed to send email: {e}")
+            return False
+    
+    def _deliver_email_bulk(self, recipients: List[str], subject: str,
+                            html_content: str, text_content: str = None) -> bool:
+        """
+        Send a separate copy of one email to each recipient
+        
+        Recipients never see each other's addresses. Recipients are split
+        into batches of max_messages_per_conn, and the batches are sent in
+        parallel, each over its own pooled connection, so SMTP round trips
+        overlap across up to the pool's size. Sending stops once a third of
+        the batch (at least 10 messages) has been refused.
+        """
+        if not recipients:
+            return True
+        
+        max_failures = max(30, len(recipients)) // 3
+        batch_size = self._pool.max_messages_per_conn
+        batches = [
+            recipients[start:start + batch_size]
+            for start in range(0, len(recipients), batch_size)
+        ]
+        logger = current_app.logger
+        failures = 0
+        failures_lock = threading.Lock()
+        aborted = threading.Event()
+        
+        try:
+            if not text_content and all(recipient.isascii() for recipient in recipients):
+                prefix, suffix = self._html_message_parts(subject, html_content)
+                
+                def make_sender():
+                    def send(conn, recipient):
+                        conn.sendmail(
+                            self.from_email, [recipient],
+                            prefix + recipient.encode('ascii') + suffix
+                        )
+                    return send
+            else:
+                def make_sender():
+                    # Each batch edits the To: header of its own message copy
+                    msg = self._build_message([recipients[0]], subject, html_content, text_content)
                     
-                    encoders.encode_base64(part)
-                    part.add_header(
-                        'Content-Disposition',
-                        f'attachment; filename= {attachment["filename"]}'
-                    )
-                    msg.attach(part)
+                    def send(conn, recipient):
+                        msg.replace_header('To', recipient)
+                        conn.send_message(msg)
+                    return send
             
-            # Send email
-            server = self._create_connection()
-            if server:
-                server.send_message(msg)
-                server.quit()
+            def deliver_batch(batch: List[str]) -> bool:
+                nonlocal failures
+                send = make_sender()
+                with self._pool.acquire() as conn:
+                    if not conn:
+                        return False
+                    
+                    for recipient in batch:
+                        if aborted.is_set():
+                            return False
+                        try:
+                            send(conn, recipient)
+                        except smtplib.SMTPServerDisconnected:
+                            raise
+                        except smtplib.SMTPException as e:
+                            logger.warning(f"Failed to send email to {recipient}: {e}")
+                            with failures_lock:
+                                failures += 1
+                                if failures >= max_failures:
+                                    aborted.set()
                 return True
-            return False
+            
+            if len(batches) == 1:
+                delivered = [deliver_batch(batches[0])]
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=min(len(batches), self._pool.max_size)
+                ) as executor:
+                    delivered = list(executor.map(deliver_batch, batches))
+            
+            if aborted.is_set():
+                logger.error(f"Aborted bulk email after {failures} failures: {subject}")
+                return False
+            
+            return all(delivered) and failures < len(recipients)
             
         except Exception as e:
-            current_app.logger.error(f"Failed to send email: {e}")
+            logger.error(f"Failed to send bulk email: {e}")
             return False
     
     def send_assignment_notification(self, student_email: str, student_name: str,
@@ -88,52 +631,7 @@ class EmailService:
                                    subject: str) -> bool:
         """Send new assignment notification to student"""
         
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #2563eb; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; background: #f9fafb; }
-                .assignment-details { background: white; padding: 20px; border-radius: 8px; margin: 20px 0; }
-                .footer { background: #374151; color: white; padding: 15px; text-align: center; font-size: 12px; }
-                .btn { background: #2563eb; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎓 SACEL - New Assignment</h1>
-            </div>
-            <div class="content">
-                <h2>Hello {{ student_name }}!</h2>
-                <p>You have a new assignment that requires your attention.</p>
-                
-                <div class="assignment-details">
-                    <h3>📚 {{ assignment_title }}</h3>
-                    <p><strong>Subject:</strong> {{ subject }}</p>
-                    <p><strong>Teacher:</strong> {{ teacher_name }}</p>
-                    <p><strong>Due Date:</strong> {{ due_date.strftime('%B %d, %Y at %I:%M %p') }}</p>
-                    
-                    <a href="http://localhost:5000/students/assignments/{{ assignment_id }}" class="btn">
-                        View Assignment
-                    </a>
-                </div>
-                
-                <p>Please log in to your student portal to view the complete assignment details and submit your work.</p>
-                <p>If you have any questions, please contact your teacher or school administration.</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 SACEL Platform - South African Comprehensive Education & Learning</p>
-                <p>This is an automated message. Please do not reply to this email.</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        template = Template(html_template)
-        html_content = template.render(
+        html_content = _ASSIGNMENT_TEMPLATE.render(
             student_name=student_name,
             assignment_title=assignment_title,
             assignment_id=assignment_id,
@@ -151,61 +649,7 @@ class EmailService:
                                subject: str) -> bool:
         """Send grade notification to student"""
         
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #059669; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; background: #f9fafb; }
-                .grade-card { background: white; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #059669; }
-                .grade { font-size: 2em; font-weight: bold; color: #059669; text-align: center; margin: 10px 0; }
-                .feedback { background: #f0f9ff; padding: 15px; border-radius: 6px; margin: 15px 0; }
-                .footer { background: #374151; color: white; padding: 15px; text-align: center; font-size: 12px; }
-                .btn { background: #059669; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎯 SACEL - Assignment Graded</h1>
-            </div>
-            <div class="content">
-                <h2>Hello {{ student_name }}!</h2>
-                <p>Your assignment has been graded and feedback is available.</p>
-                
-                <div class="grade-card">
-                    <h3>📝 {{ assignment_title }}</h3>
-                    <p><strong>Subject:</strong> {{ subject }}</p>
-                    <p><strong>Teacher:</strong> {{ teacher_name }}</p>
-                    
-                    <div class="grade">{{ grade }}</div>
-                    
-                    {% if feedback %}
-                    <div class="feedback">
-                        <h4>📋 Teacher Feedback:</h4>
-                        <p>{{ feedback }}</p>
-                    </div>
-                    {% endif %}
-                    
-                    <a href="http://localhost:5000/students/assignments" class="btn">
-                        View All Grades
-                    </a>
-                </div>
-                
-                <p>Keep up the great work! Continue to engage with your assignments and strive for excellence.</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 SACEL Platform - South African Comprehensive Education & Learning</p>
-                <p>This is an automated message. Please do not reply to this email.</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        template = Template(html_template)
-        html_content = template.render(
+        html_content = _GRADE_TEMPLATE.render(
             student_name=student_name,
             assignment_title=assignment_title,
             grade=grade,
@@ -223,87 +667,21 @@ class EmailService:
                                          additional_info: str = None) -> bool:
         """Send admission status update to applicant"""
         
-        status_colors = {
-            'accepted': '#059669',
-            'rejected': '#dc2626',
-            'pending': '#d97706',
-            'waitlisted': '#7c3aed'
-        }
-        
-        status_icons = {
-            'accepted': '🎉',
-            'rejected': '😔',
-            'pending': '⏳',
-            'waitlisted': '📝'
-        }
-        
-        color = status_colors.get(status, '#6b7280')
-        icon = status_icons.get(status, '📧')
-        
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: {{ color }}; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; background: #f9fafb; }
-                .status-card { background: white; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid {{ color }}; }
-                .status { font-size: 1.5em; font-weight: bold; color: {{ color }}; text-align: center; margin: 15px 0; text-transform: uppercase; }
-                .info { background: #f0f9ff; padding: 15px; border-radius: 6px; margin: 15px 0; }
-                .footer { background: #374151; color: white; padding: 15px; text-align: center; font-size: 12px; }
-                .btn { background: {{ color }}; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>{{ icon }} SACEL - Admission Update</h1>
-            </div>
-            <div class="content">
-                <h2>Dear {{ applicant_name }},</h2>
-                <p>We have an update regarding your application to {{ school_name }}.</p>
-                
-                <div class="status-card">
-                    <h3>📋 Application #{{ application_id }}</h3>
-                    <p><strong>School:</strong> {{ school_name }}</p>
-                    
-                    <div class="status">{{ status }}</div>
-                    
-                    {% if additional_info %}
-                    <div class="info">
-                        <h4>📌 Additional Information:</h4>
-                        <p>{{ additional_info }}</p>
-                    </div>
-                    {% endif %}
-                    
-                    <a href="http://localhost:5000/admissions/status?id={{ application_id }}" class="btn">
-                        View Application Status
-                    </a>
-                </div>
-                
-                <p>For any questions about your application, please contact the school administration or visit our platform.</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 SACEL Platform - South African Comprehensive Education & Learning</p>
-                <p>This is an automated message. Please do not reply to this email.</p>
-            </div>
-        </body>
-        </html>
-        """
+        color = _STATUS_COLORS.get(status, '#6b7280')
+        icon = _STATUS_ICONS.get(status, '📧')
+        status_title = status.title()
         
-        template = Template(html_template)
-        html_content = template.render(
+        html_content = _ADMISSION_TEMPLATE.render(
             applicant_name=applicant_name,
             school_name=school_name,
-            status=status.title(),
+            status=status_title,
             application_id=application_id,
             additional_info=additional_info,
             color=color,
             icon=icon
         )
         
-        subject_line = f"{icon} Admission Update: {school_name} - {status.title()}"
+        subject_line = f"{icon} Admission Update: {school_name} - {status_title}"
         return self._send_email([applicant_email], subject_line, html_content)
     
     def send_system_announcement(self, recipient_emails: List[str], 
@@ -312,81 +690,22 @@ class EmailService:
                                author: str = 'SACEL Admin') -> bool:
         """Send system-wide announcements"""
         
-        priority_colors = {
-            'low': '#6b7280',
-            'normal': '#2563eb', 
-            'high': '#d97706',
-            'urgent': '#dc2626'
-        }
-        
-        priority_icons = {
-            'low': '📢',
-            'normal': '📢',
-            'high': '⚠️',
-            'urgent': '🚨'
-        }
-        
-        color = priority_colors.get(priority, '#2563eb')
-        icon = priority_icons.get(priority, '📢')
-        
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: {{ color }}; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; background: #f9fafb; }
-                .announcement { background: white; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid {{ color }}; }
-                .priority { background: {{ color }}; color: white; padding: 5px 15px; border-radius: 20px; font-size: 12px; text-transform: uppercase; display: inline-block; margin: 10px 0; }
-                .footer { background: #374151; color: white; padding: 15px; text-align: center; font-size: 12px; }
-                .btn { background: {{ color }}; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>{{ icon }} SACEL - System Announcement</h1>
-            </div>
-            <div class="content">
-                <div class="announcement">
-                    <div class="priority">{{ priority }} Priority</div>
-                    <h2>{{ announcement_title }}</h2>
-                    <p><strong>From:</strong> {{ author }}</p>
-                    <p><strong>Date:</strong> {{ current_date }}</p>
-                    
-                    <div style="margin: 20px 0; padding: 15px; background: #f8fafc; border-radius: 6px;">
-                        {{ content | safe }}
-                    </div>
-                    
-                    <a href="http://localhost:5000/" class="btn">
-                        Access Platform
-                    </a>
-                </div>
-                
-                <p>Please log in to your account for more details and to stay updated with the latest announcements.</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 SACEL Platform - South African Comprehensive Education & Learning</p>
-                <p>This is an automated message. Please do not reply to this email.</p>
-            </div>
-        </body>
-        </html>
-        """
+        color = _PRIORITY_COLORS.get(priority, '#2563eb')
+        icon = _PRIORITY_ICONS.get(priority, '📢')
+        priority_title = priority.title()
         
-        template = Template(html_template)
-        html_content = template.render(
+        html_content = _ANNOUNCEMENT_TEMPLATE.render(
             announcement_title=announcement_title,
             content=content,
-            priority=priority.title(),
+            priority=priority_title,
             author=author,
             current_date=datetime.now().strftime('%B %d, %Y at %I:%M %p'),
             color=color,
             icon=icon
         )
         
-        subject_line = f"{icon} {priority.title()} Announcement: {announcement_title}"
-        return self._send_email(recipient_emails, subject_line, html_content)
+        subject_line = f"{icon} {priority_title} Announcement: {announcement_title}"
+        return self._send_email_bulk(recipient_emails, subject_line, html_content)
     
     def send_teacher_notification(self, teacher_email: str, teacher_name: str,
                                 notification_type: str, details: Dict[str, Any]) -> bool:
@@ -405,51 +724,7 @@ class EmailService:
                                     details: Dict[str, Any]) -> bool:
         """Notify teacher of new assignment submission"""
         
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #7c3aed; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; background: #f9fafb; }
-                .submission-card { background: white; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #7c3aed; }
-                .footer { background: #374151; color: white; padding: 15px; text-align: center; font-size: 12px; }
-                .btn { background: #7c3aed; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>📄 SACEL - New Submission</h1>
-            </div>
-            <div class="content">
-                <h2>Hello {{ teacher_name }}!</h2>
-                <p>A student has submitted their assignment and is ready for your review.</p>
-                
-                <div class="submission-card">
-                    <h3>📝 {{ assignment_title }}</h3>
-                    <p><strong>Student:</strong> {{ student_name }}</p>
-                    <p><strong>Submitted:</strong> {{ submission_date }}</p>
-                    <p><strong>Status:</strong> Ready for Grading</p>
-                    
-                    <a href="http://localhost:5000/teachers/grading/{{ assignment_id }}" class="btn">
-                        Review Submission
-                    </a>
-                </div>
-                
-                <p>Please review the submission and provide feedback to help the student learn and improve.</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 SACEL Platform - South African Comprehensive Education & Learning</p>
-                <p>This is an automated message. Please do not reply to this email.</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        template = Template(html_template)
-        html_content = template.render(
+        html_content = _SUBMISSION_TEMPLATE.render(
             teacher_name=teacher_name,
             assignment_title=details.get('assignment_title'),
             student_name=details.get('student_name'),
@@ -464,51 +739,7 @@ class EmailService:
                              details: Dict[str, Any]) -> bool:
         """Send grading reminder to teacher"""
         
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #d97706; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; background: #f9fafb; }
-                .reminder-card { background: white; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #d97706; }
-                .footer { background: #374151; color: white; padding: 15px; text-align: center; font-size: 12px; }
-                .btn { background: #d97706; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px 0; }
-                .pending-count { font-size: 2em; font-weight: bold; color: #d97706; text-align: center; margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>⏰ SACEL - Grading Reminder</h1>
-            </div>
-            <div class="content">
-                <h2>Hello {{ teacher_name }}!</h2>
-                <p>You have assignments waiting to be graded. Students are eager to receive their feedback!</p>
-                
-                <div class="reminder-card">
-                    <h3>📚 Pending Assignments</h3>
-                    <div class="pending-count">{{ pending_count }}</div>
-                    <p>assignments ready for grading</p>
-                    
-                    <a href="http://localhost:5000/teachers/grading" class="btn">
-                        Grade Assignments
-                    </a>
-                </div>
-                
-                <p>Timely feedback helps students learn more effectively. Thank you for your dedication to education!</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 SACEL Platform - South African Comprehensive Education & Learning</p>
-                <p>This is an automated message. Please do not reply to this email.</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        template = Template(html_template)
-        html_content = template.render(
+        html_content = _GRADING_REMINDER_TEMPLATE.render(
             teacher_name=teacher_name,
             pending_count=details.get('pending_count', 0)
         )
@@ -520,79 +751,7 @@ class EmailService:
                           user_role: str, temporary_password: str = None) -> bool:
         """Send welcome email to new users"""
         
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: #059669; color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; background: #f9fafb; }
-                .welcome-card { background: white; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #059669; }
-                .credentials { background: #fef3c7; padding: 15px; border-radius: 6px; margin: 15px 0; border: 1px solid #f59e0b; }
-                .footer { background: #374151; color: white; padding: 15px; text-align: center; font-size: 12px; }
-                .btn { background: #059669; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎓 Welcome to SACEL!</h1>
-            </div>
-            <div class="content">
-                <h2>Hello {{ user_name }}!</h2>
-                <p>Welcome to the South African Comprehensive Education & Learning platform.</p>
-                
-                <div class="welcome-card">
-                    <h3>🚀 Your Account is Ready</h3>
-                    <p><strong>Role:</strong> {{ user_role.replace('_', ' ').title() }}</p>
-                    <p><strong>Email:</strong> {{ user_email }}</p>
-                    
-                    {% if temporary_password %}
-                    <div class="credentials">
-                        <h4>🔐 Login Credentials</h4>
-                        <p><strong>Temporary Password:</strong> {{ temporary_password }}</p>
-                        <p><em>Please change your password after your first login for security.</em></p>
-                    </div>
-                    {% endif %}
-                    
-                    <a href="http://localhost:5000/auth/login" class="btn">
-                        Login to Platform
-                    </a>
-                </div>
-                
-                <h3>🌟 Platform Features:</h3>
-                <ul>
-                    {% if user_role == 'student' %}
-                    <li>📚 Access assignments and coursework</li>
-                    <li>📊 View grades and progress reports</li>
-                    <li>📁 Upload and manage files</li>
-                    <li>🌍 Multi-language support</li>
-                    {% elif user_role == 'teacher' %}
-                    <li>📝 Create and manage assignments</li>
-                    <li>🎯 AI-powered grading tools</li>
-                    <li>📊 Student analytics and insights</li>
-                    <li>📁 File management system</li>
-                    {% elif user_role in ['school_admin', 'principal'] %}
-                    <li>👥 User management</li>
-                    <li>📊 School analytics dashboard</li>
-                    <li>📋 Admission management</li>
-                    <li>🔧 System administration</li>
-                    {% endif %}
-                </ul>
-                
-                <p>If you have any questions, please contact our support team or your school administrator.</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 SACEL Platform - South African Comprehensive Education & Learning</p>
-                <p>This is an automated message. Please do not reply to this email.</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        template = Template(html_template)
-        html_content = template.render(
+        html_content = _WELCOME_TEMPLATE.render(
             user_name=user_name,
             user_email=user_email,
             user_role=user_role,
@@ -1,4 +1,6 @@
 import os
+import sqlite3
+import threading
 import uuid
 import hashlib
 # import magic  # Temporarily disabled due to installation issues
@@ -6,6 +8,7 @@ from werkzeug.utils import secure_filename
 from flask import current_app
 import mimetypes
 from datetime import datetime
+from functools import lru_cache
 import json
 
 MAGIC_AVAILABLE = False  # Temporarily disabled
@@ -15,33 +18,65 @@ MAGIC_AVAILABLE = False  # Temporarily disabled
 # except ImportError:
 #     MAGIC_AVAILABLE = False
 
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
+# Pillow, pyvips and the PDF libraries are imported on first use rather than at
+# import, as most requests never touch an image or PDF
+@lru_cache(maxsize=None)
+def _pil_image():
+    """PIL's Image module, or None if Pillow is not installed"""
+    try:
+        from PIL import Image
+        return Image
+    except ImportError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _pyvips():
+    """The pyvips module, or None if libvips bindings are not installed"""
+    try:
+        import pyvips
+        return pyvips
+    except (ImportError, OSError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def _pdfium():
+    """The pypdfium2 module, or None if it is not installed"""
+    try:
+        import pypdfium2
+        return pypdfium2
+    except ImportError:
+        return None
+
+
+def _pdf_available():
+    """Whether pypdfium2 is installed for PDF text extraction"""
+    return _pdfium() is not None
+
+
+# Per-thread connections to the upload metadata database
+_metadata_local = threading.local()
 
-try:
-    import PyPDF2
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
 
 class FileService:
     """Enhanced service for handling secure file uploads and management"""
     
     # File type configurations
     ALLOWED_EXTENSIONS = {
-        'documents': {'pdf', 'doc', 'docx', 'txt', 'rtf', 'odt', 'pages'},
-        'images': {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'svg', 'webp'},
-        'multimedia': {'mp4', 'avi', 'mov', 'mp3', 'wav', 'm4a', 'ogg'},
-        'archives': {'zip', 'rar', '7z', 'tar', 'gz'},
-        'presentations': {'ppt', 'pptx', 'odp', 'key'},
-        'spreadsheets': {'xls', 'xlsx', 'ods', 'numbers', 'csv'}
+        'documents': frozenset({'pdf', 'doc', 'docx', 'txt', 'rtf', 'odt', 'pages'}),
+        'images': frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp', 'svg', 'webp'}),
+        'multimedia': frozenset({'mp4', 'avi', 'mov', 'mp3', 'wav', 'm4a', 'ogg'}),
+        'archives': frozenset({'zip', 'rar', '7z', 'tar', 'gz'}),
+        'presentations': frozenset({'ppt', 'pptx', 'odp', 'key'}),
+        'spreadsheets': frozenset({'xls', 'xlsx', 'ods', 'numbers', 'csv'})
     }
     
+    # Every extension above; any of them is accepted whatever the file_type
+    ALL_EXTENSIONS = frozenset().union(*ALLOWED_EXTENSIONS.values())
+    
     # MIME type whitelist for enhanced security
-    ALLOWED_MIME_TYPES = {
+    ALLOWED_MIME_TYPES = frozenset({
         'application/pdf',
         'text/plain',
         'text/rtf',
@@ -58,7 +93,7 @@ class FileService:
         'video/quicktime',
         'application/zip',
         'text/csv'
-    }
+    })
     
     # Maximum file sizes (in bytes)
     MAX_FILE_SIZES = {
@@ -70,8 +105,9 @@ class FileService:
         'spreadsheets': 10 * 1024 * 1024   # 10MB
     }
     
-    # Malicious file patterns to check
-    MALICIOUS_PATTERNS = [
+    # Malicious file patterns to check, all lowercase as content is
+    # lowercased before matching
+    MALICIOUS_PATTERNS = (
         b'<%',  # PHP/ASP tags
         b'<?php',
         b'<script',
@@ -82,11 +118,37 @@ class FileService:
         b'<iframe',
         b'<object',
         b'<embed'
-    ]
+    )
+    
+    # Bytes carried between scan chunks so a pattern split across two is found
+    MALICIOUS_PATTERN_OVERLAP = max(len(pattern) for pattern in MALICIOUS_PATTERNS) - 1
+    
+    # Uploads are scanned in chunks small enough to stay in CPU cache
+    SCAN_CHUNK_SIZE = 256 * 1024
+    
+    # Bytes of an upload handed to libmagic for MIME type detection
+    MIME_SNIFF_SIZE = 64 * 1024
+    
+    # Binary media and archives are only scanned in their first and last
+    # bytes, where polyglot payloads sit; everything else, SVG included, is
+    # scanned in full. Chosen by extension, since any allowed extension can
+    # be uploaded under any file_type
+    SCAN_WINDOW = (64 * 1024, 4 * 1024)
+    WINDOWED_SCAN_EXTENSIONS = (
+        (ALLOWED_EXTENSIONS['images'] - {'svg'})
+        | ALLOWED_EXTENSIONS['multimedia']
+        | ALLOWED_EXTENSIONS['archives']
+    )
     
     @staticmethod
-    def validate_file(file, file_type='documents', max_size=None):
-        """Comprehensive file validation"""
+    def validate_file(file, file_type='documents', max_size=None, sink=None):
+        """
+        Comprehensive file validation
+        
+        If sink is a writable binary file, the upload is copied into it on
+        the same pass that scans and hashes it. The copy is only complete
+        when the file is valid.
+        """
         if not file or file.filename == '':
             return {'valid': False, 'error': 'No file provided'}
         
@@ -94,13 +156,14 @@ class FileService:
         if not FileService.allowed_file(file.filename, file_type):
             return {'valid': False, 'error': f'File type not allowed for {file_type}'}
         
-        # Get file content for additional checks
-        file.seek(0)
-        file_content = file.read()
-        file.seek(0)  # Reset file pointer
+        # Size, type and content checks read the upload stream in chunks,
+        # so it is never held in memory as a whole
+        stream = file.stream
+        stream.seek(0, os.SEEK_END)
+        file_size = stream.tell()
+        stream.seek(0)
         
         # Check file size
-        file_size = len(file_content)
         max_allowed_size = max_size or FileService.MAX_FILE_SIZES.get(file_type, 10 * 1024 * 1024)
         
         if file_size > max_allowed_size:
@@ -113,10 +176,12 @@ class FileService:
             return {'valid': False, 'error': 'Empty file not allowed'}
         
         # Check MIME type using python-magic
+        mime_type = None
         if MAGIC_AVAILABLE:
             try:
                 import magic
-                mime_type = magic.from_buffer(file_content, mime=True)
+                mime_type = magic.from_buffer(stream.read(FileService.MIME_SNIFF_SIZE), mime=True)
+                stream.seek(0)
                 if mime_type not in FileService.ALLOWED_MIME_TYPES:
                     return {'valid': False, 'error': f'MIME type {mime_type} not allowed'}
             except Exception as e:
@@ -125,38 +190,100 @@ class FileService:
             # Fallback to basic extension check if python-magic is not available
             current_app.logger.warning("python-magic not available, using basic validation")
         
-        # Check for malicious patterns
-        file_content_lower = file_content.lower()
-        for pattern in FileService.MALICIOUS_PATTERNS:
-            if pattern in file_content_lower:
-                return {'valid': False, 'error': 'File contains potentially malicious content'}
+        # Check for malicious patterns, hashing (and copying to sink) the
+        # file on the same pass where the whole file is scanned
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        head, tail = FileService.SCAN_WINDOW
+        hash_sha256 = hashlib.sha256()
+        if (extension in FileService.WINDOWED_SCAN_EXTENSIONS
+                and not (mime_type or '').startswith('text/')
+                and file_size > head + tail):
+            head_bytes = stream.read(head)
+            stream.seek(-tail, os.SEEK_END)
+            malicious = (FileService._contains_malicious_pattern([head_bytes])
+                         or FileService._contains_malicious_pattern([stream.read()]))
+            stream.seek(0)
+            if not malicious and sink is None:
+                hash_sha256 = FileService._hash_stream(stream)
+            elif not malicious:
+                for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+                    hash_sha256.update(chunk)
+                    sink.write(chunk)
+        else:
+            def chunks():
+                for chunk in iter(lambda: stream.read(FileService.SCAN_CHUNK_SIZE), b''):
+                    hash_sha256.update(chunk)
+                    if sink is not None:
+                        sink.write(chunk)
+                    yield chunk
+            malicious = FileService._contains_malicious_pattern(chunks())
+        stream.seek(0)  # Reset file pointer
+        if malicious:
+            return {'valid': False, 'error': 'File contains potentially malicious content'}
         
         # Additional image validation
         if file_type == 'images':
-            image_validation = FileService._validate_image_content(file_content)
+            image_validation = FileService._validate_image_content(stream)
+            stream.seek(0)
             if not image_validation['valid']:
                 return image_validation
         
-        return {'valid': True, 'mime_type': mime_type if 'mime_type' in locals() else None}
+        return {
+            'valid': True,
+            'mime_type': mime_type,
+            'file_hash': hash_sha256.hexdigest(),
+            'extension': extension
+        }
+    
+    @staticmethod
+    def _contains_malicious_pattern(chunks):
+        """Case-insensitively search a sequence of byte chunks for MALICIOUS_PATTERNS"""
+        # Each chunk is lowercased and checked while it is still in cache,
+        # rather than lowercasing a copy of the whole file. The tail of each
+        # chunk is carried over so a pattern spanning a boundary is found.
+        overlap = FileService.MALICIOUS_PATTERN_OVERLAP
+        carry = b''
+        
+        for chunk in chunks:
+            lowered = carry + chunk.lower()
+            for pattern in FileService.MALICIOUS_PATTERNS:
+                if pattern in lowered:
+                    return True
+            carry = lowered[-overlap:]
+        return False
+    
+    @staticmethod
+    def _hash_stream(stream):
+        """SHA-256 hash of a binary stream from its current position"""
+        # Python 3.11+ hashes the whole stream in C
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(stream, "sha256")
+        
+        hash_sha256 = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+            hash_sha256.update(chunk)
+        return hash_sha256
     
     @staticmethod
-    def _validate_image_content(file_content):
+    def _validate_image_content(stream):
         """Validate image file content"""
-        if not PIL_AVAILABLE:
+        Image = _pil_image()
+        if Image is None:
             return {'valid': True}  # Skip validation if PIL not available
         
         try:
-            from io import BytesIO
-            img = Image.open(BytesIO(file_content))
-            img.verify()  # Verify it's a valid image
+            img = Image.open(stream)
             
-            # Check image dimensions (prevent extremely large images)
-            img = Image.open(BytesIO(file_content))
+            # Check image dimensions (prevent extremely large images); the
+            # size comes from the header parsed by open(), before verify()
+            # leaves the image unusable
             width, height = img.size
             
             if width > 10000 or height > 10000:
                 return {'valid': False, 'error': 'Image dimensions too large'}
             
+            img.verify()  # Verify it's a valid image
+            
             return {'valid': True}
         except Exception as e:
             return {'valid': False, 'error': f'Invalid image file: {str(e)}'}
@@ -164,32 +291,20 @@ class FileService:
     @staticmethod
     def allowed_file(filename, file_type='documents'):
         """Check if file extension is allowed"""
-        if '.' not in filename:
+        # Extensions from every file type are accepted, so this is a
+        # single lookup in the combined set
+        dot = filename.rfind('.')
+        if dot < 0:
             return False
         
-        extension = filename.rsplit('.', 1)[1].lower()
-        allowed_extensions = FileService.ALLOWED_EXTENSIONS.get(file_type, set())
-        
-        # Also check combined extensions
-        for ext_type, extensions in FileService.ALLOWED_EXTENSIONS.items():
-            if extension in extensions:
-                return True
-        
-        return extension in allowed_extensions
+        return filename[dot + 1:].lower() in FileService.ALL_EXTENSIONS
     
     @staticmethod
     def save_file(file, upload_folder, subfolder=None, file_type='documents', user_id=None):
         """Save uploaded file with enhanced security and metadata"""
-        # Validate file first
-        validation = FileService.validate_file(file, file_type)
-        if not validation['valid']:
-            return {'success': False, 'error': validation['error']}
-        
+        partial_path = None
         try:
-            # Generate unique filename
-            file_extension = file.filename.rsplit('.', 1)[1].lower()
             unique_id = uuid.uuid4().hex
-            unique_filename = f"{unique_id}.{file_extension}"
             
             # Create full path
             if subfolder:
@@ -199,13 +314,25 @@ class FileService:
             
             os.makedirs(folder_path, exist_ok=True)
             
+            # Validate the file while writing it to a partial file, so the
+            # upload is read once; it is moved into place only if valid
+            partial_path = os.path.join(folder_path, f"{unique_id}.part")
+            with open(partial_path, 'wb') as partial:
+                validation = FileService.validate_file(file, file_type, sink=partial)
+            if not validation['valid']:
+                os.remove(partial_path)
+                return {'success': False, 'error': validation['error']}
+            
+            # Generate unique filename; the extension was checked against
+            # the allowlist during validation
+            file_extension = validation['extension']
+            unique_filename = f"{unique_id}.{file_extension}"
+            
             file_path = os.path.join(folder_path, unique_filename)
             
             # Save file
-            file.save(file_path)
-            
-            # Calculate file hash for integrity checking
-            file_hash = FileService._calculate_file_hash(file_path)
+            os.replace(partial_path, file_path)
+            partial_path = None
             
             # Get file info
             file_info = {
@@ -216,23 +343,26 @@ class FileService:
                 'relative_path': os.path.join(subfolder or '', unique_filename),
                 'file_size': os.path.getsize(file_path),
                 'mime_type': validation.get('mime_type') or mimetypes.guess_type(file_path)[0],
-                'file_hash': file_hash,
+                'file_hash': validation['file_hash'],
                 'upload_timestamp': datetime.utcnow().isoformat(),
                 'user_id': user_id,
                 'file_type': file_type
             }
             
             # Create thumbnail for images
-            if file_type == 'images' and PIL_AVAILABLE:
+            if file_type == 'images' and _pil_image() is not None:
                 thumbnail_path = FileService._create_thumbnail(file_path, folder_path, unique_id)
                 if thumbnail_path:
                     file_info['thumbnail_path'] = thumbnail_path
             
             # Extract text content for searchable documents
             if file_type == 'documents':
-                text_content = FileService._extract_text_content(file_path, file_extension)
-                if text_content:
-                    file_info['text_content'] = text_content[:5000]  # Limit to 5000 chars
+                extracted = FileService._extract_text_content(file_path, file_extension)
+                if extracted['text']:
+                    file_info['text_content'] = extracted['text'][:5000]  # Limit to 5000 chars
+                # Stored so get_file_info need not parse the PDF again
+                if extracted['page_count'] is not None:
+                    file_info['page_count'] = extracted['page_count']
             
             # Save metadata
             FileService._save_file_metadata(file_info)
@@ -241,17 +371,16 @@ class FileService:
             
         except Exception as e:
             current_app.logger.error(f"File save error: {str(e)}")
+            if partial_path and os.path.exists(partial_path):
+                os.remove(partial_path)
             return {'success': False, 'error': 'Failed to save file'}
     
     @staticmethod
     def _calculate_file_hash(file_path):
         """Calculate SHA-256 hash of file for integrity checking"""
-        hash_sha256 = hashlib.sha256()
         try:
             with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_sha256.update(chunk)
-            return hash_sha256.hexdigest()
+                return FileService._hash_stream(f).hexdigest()
         except Exception:
             return None
     
@@ -264,12 +393,29 @@ class FileService:
             
             os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
             
+            # libvips shrinks on load and never holds the full-size image
+            # in memory; Pillow is used when it is not installed
+            pyvips = _pyvips()
+            if pyvips is not None:
+                thumb = pyvips.Image.thumbnail(image_path, 200, height=200, size='down')
+                if thumb.hasalpha():
+                    thumb = thumb[:thumb.bands - 1]
+                thumb.write_to_file(thumbnail_path, Q=85)
+                return thumbnail_path
+            
+            Image = _pil_image()
             with Image.open(image_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'P'):
+                # Palette images only resize with nearest neighbour, so they
+                # are converted first
+                if img.mode == 'P':
                     img = img.convert('RGB')
                 
+                # thumbnail() has JPEGs decoded at a reduced scale (draft)
                 img.thumbnail((200, 200), Image.Resampling.LANCZOS)
+                
+                # Other conversions to RGB run on the shrunk image
+                if img.mode == 'RGBA':
+                    img = img.convert('RGB')
                 img.save(thumbnail_path, 'JPEG', quality=85)
                 
             return thumbnail_path
@@ -279,61 +425,129 @@ class FileService:
     
     @staticmethod
     def _extract_text_content(file_path, file_extension):
-        """Extract text content from various file types"""
-        text_content = ""
+        """Extract text content, and a PDF's page count, from various file types"""
+        extracted = {'text': "", 'page_count': None}
         
         try:
             if file_extension == 'txt':
                 with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    text_content = f.read()
+                    extracted['text'] = f.read()
             
-            elif file_extension == 'pdf' and PYPDF2_AVAILABLE:
-                text_content = FileService.extract_text_from_pdf(file_path)
+            elif file_extension == 'pdf' and _pdf_available():
+                extracted = FileService._read_pdf(file_path)
             
             # Add more extractors for other document types as needed
             
         except Exception as e:
             current_app.logger.warning(f"Text extraction failed for {file_path}: {str(e)}")
         
-        return text_content
+        return extracted
+    
+    @staticmethod
+    def _get_metadata_conn():
+        """
+        Connection to instance/metadata.db, the upload metadata store
+        
+        One row per saved file, keyed by saved filename, holding the same
+        JSON that used to be written to instance/metadata/<name>.json.
+        Connections are per thread, as sqlite3 connections cannot be shared.
+        """
+        db_path = os.path.join(current_app.instance_path, 'metadata.db')
+        conn = getattr(_metadata_local, 'conn', None)
+        if conn is None or _metadata_local.path != db_path:
+            os.makedirs(current_app.instance_path, exist_ok=True)
+            conn = sqlite3.connect(db_path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, info TEXT NOT NULL)"
+            )
+            _metadata_local.conn = conn
+            _metadata_local.path = db_path
+        return conn
     
     @staticmethod
     def _save_file_metadata(file_info):
-        """Save file metadata to JSON for tracking"""
+        """Save file metadata for tracking"""
         try:
-            metadata_dir = os.path.join(current_app.instance_path, 'metadata')
-            os.makedirs(metadata_dir, exist_ok=True)
-            
-            metadata_file = os.path.join(metadata_dir, f"{file_info['saved_filename']}.json")
-            
-            with open(metadata_file, 'w') as f:
-                json.dump(file_info, f, indent=2)
-                
+            conn = FileService._get_metadata_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO files (name, info) VALUES (?, ?)",
+                (file_info['saved_filename'], json.dumps(file_info))
+            )
         except Exception as e:
             current_app.logger.error(f"Failed to save metadata: {str(e)}")
     
+    @staticmethod
+    def _load_file_metadata(filename):
+        """Load a saved file's metadata, or None if there is none"""
+        try:
+            row = FileService._get_metadata_conn().execute(
+                "SELECT info FROM files WHERE name = ?", (filename,)
+            ).fetchone()
+            if row:
+                return json.loads(row[0])
+            
+            # Files saved before the metadata database have a JSON file
+            metadata_file = os.path.join(
+                current_app.instance_path, 'metadata', f"{filename}.json"
+            )
+            with open(metadata_file, 'r') as f:
+                return json.load(f)
+        except Exception:
+            return None
+    
+    @staticmethod
+    def _delete_file_metadata(filename):
+        """Delete a saved file's metadata"""
+        FileService._get_metadata_conn().execute("DELETE FROM files WHERE name = ?", (filename,))
+        
+        metadata_file = os.path.join(current_app.instance_path, 'metadata', f"{filename}.json")
+        if os.path.exists(metadata_file):
+            os.remove(metadata_file)
+    
     @staticmethod
     def extract_text_from_pdf(file_path):
         """Extract text content from PDF for indexing"""
-        if not PYPDF2_AVAILABLE:
-            current_app.logger.warning("PyPDF2 not available for PDF text extraction")
+        if not _pdf_available():
+            current_app.logger.warning("pypdfium2 not available for PDF text extraction")
             return ""
         
+        return FileService._read_pdf(file_path)['text']
+    
+    @staticmethod
+    def _read_pdf(file_path):
+        """Extract a PDF's text and page count from a single parse"""
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
+            pdf = _pdfium().PdfDocument(file_path)
+            try:
+                parts = []
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    parts.append(textpage.get_text_range() + "\n")
+                    textpage.close()
+                    page.close()
+                return {'text': "".join(parts), 'page_count': len(pdf)}
+            finally:
+                pdf.close()
         except Exception as e:
             current_app.logger.error(f"PDF text extraction failed: {str(e)}")
-            return ""
+            return {'text': "", 'page_count': None}
+    
+    @staticmethod
+    def _pdf_page_count(file_path):
+        """Count a PDF's pages without extracting its text"""
+        pdf = _pdfium().PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
     
     @staticmethod
     def validate_image(file_path):
         """Validate and get image information"""
-        if not PIL_AVAILABLE:
+        Image = _pil_image()
+        if Image is None:
             return {'valid': False, 'error': 'PIL not available'}
         
         try:
@@ -370,12 +584,7 @@ class FileService:
             
             # Delete metadata
             if delete_metadata:
-                filename = os.path.basename(file_path)
-                metadata_dir = os.path.join(current_app.instance_path, 'metadata')
-                metadata_file = os.path.join(metadata_dir, f"{filename}.json")
-                
-                if os.path.exists(metadata_file):
-                    os.remove(metadata_file)
+                FileService._delete_file_metadata(os.path.basename(file_path))
             
             return deleted
         except Exception as e:
@@ -398,28 +607,20 @@ class FileService:
         }
         
         # Load metadata if available
-        filename = os.path.basename(file_path)
-        metadata_dir = os.path.join(current_app.instance_path, 'metadata')
-        metadata_file = os.path.join(metadata_dir, f"{filename}.json")
+        metadata = FileService._load_file_metadata(os.path.basename(file_path))
+        if metadata:
+            file_info.update(metadata)
         
-        if os.path.exists(metadata_file):
-            try:
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
-                    file_info.update(metadata)
-            except Exception:
-                pass
-        
-        # Additional info for specific file types
-        if file_path.lower().endswith('.pdf') and PYPDF2_AVAILABLE:
-            try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    file_info['page_count'] = len(pdf_reader.pages)
-            except Exception:
-                file_info['page_count'] = 0
+        # Additional info for specific file types; a PDF's page count is
+        # usually already in the metadata from when it was saved
+        if file_path.lower().endswith('.pdf') and _pdf_available():
+            if 'page_count' not in file_info:
+                try:
+                    file_info['page_count'] = FileService._pdf_page_count(file_path)
+                except Exception:
+                    file_info['page_count'] = 0
         
-        elif file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')) and PIL_AVAILABLE:
+        elif file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')) and _pil_image() is not None:
             image_info = FileService.validate_image(file_path)
             file_info.update(image_info)
         
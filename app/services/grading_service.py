@@ -4,7 +4,10 @@ Provides sophisticated grading capabilities including rubric-based assessment,
 automated scoring, peer review, and detailed feedback mechanisms
 """
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import cached_property, lru_cache
 from typing import Dict, List, Optional, Tuple
 from flask import current_app
 from sqlalchemy import func, and_
@@ -13,9 +16,29 @@ from app.models import User, Assignment, Submission, UserRole
 from app.services.redis_service import redis_service
 from app.services.ai_service import AIService
 import json
-import statistics
+import random
 import re
 
+# Patterns for pulling evaluations out of AI responses
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+_SCORE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:points?|/)')
+_WORD_RE = re.compile(r'[\w-]+')
+
+# Fixed parts of the overall feedback text
+_FEEDBACK_HEADER = "=== GRADING FEEDBACK ===\n"
+_FEEDBACK_EXCELLENT = "🌟 Excellent work! You've demonstrated mastery of the material."
+_FEEDBACK_GOOD = "👍 Good work! You show strong understanding with room for refinement."
+_FEEDBACK_SATISFACTORY = "✓ Satisfactory work. You meet basic requirements but can improve further."
+_FEEDBACK_NEEDS_IMPROVEMENT = "⚠️ This work needs improvement. Please review the feedback below."
+_FEEDBACK_CRITERIA_HEADER = "=== DETAILED FEEDBACK BY CRITERIA ===\n"
+_FEEDBACK_NEXT_STEPS = "\n".join([
+    "\n=== NEXT STEPS ===",
+    "Review the specific feedback for each criteria above.",
+    "Focus on the areas marked for improvement.",
+    "Don't hesitate to ask your teacher for clarification or additional help."
+])
+
 
 class RubricCriteria:
     """Represents a single criteria in a grading rubric"""
@@ -35,6 +58,31 @@ class RubricCriteria:
             'performance_levels': self.performance_levels
         }
     
+    @cached_property
+    def levels_json(self) -> str:
+        """Performance levels as indented JSON, for AI prompts"""
+        return json.dumps(self.performance_levels, indent=2)
+    
+    @cached_property
+    def level_keywords(self) -> Dict[str, frozenset]:
+        """Each level's keywords, lowercased and with words single-spaced"""
+        return {
+            level: frozenset(
+                ' '.join(_WORD_RE.findall(keyword.lower()))
+                for keyword in data.get('keywords', [])
+            )
+            for level, data in self.performance_levels.items()
+        }
+    
+    @cached_property
+    def max_keyword_words(self) -> int:
+        """Number of words in the longest keyword phrase"""
+        return max(
+            (keyword.count(' ') + 1
+             for keywords in self.level_keywords.values() for keyword in keywords),
+            default=1
+        )
+    
     @classmethod
     def from_dict(cls, data: Dict):
         return cls(
@@ -55,6 +103,11 @@ class GradingRubric:
         self.total_points = sum(c.points for c in criteria)
     
     def to_dict(self):
+        return self._dict
+    
+    @cached_property
+    def _dict(self) -> Dict:
+        """Rubric as a dict, built once; callers must not modify it"""
         return {
             'title': self.title,
             'description': self.description,
@@ -62,6 +115,19 @@ class GradingRubric:
             'total_points': self.total_points
         }
     
+    @cached_property
+    def criteria_json(self) -> str:
+        """Criteria with their point limits as indented JSON, for AI prompts"""
+        return json.dumps([
+            {
+                'name': criteria.name,
+                'description': criteria.description,
+                'max_points': criteria.points,
+                'performance_levels': criteria.performance_levels
+            }
+            for criteria in self.criteria
+        ], indent=2)
+    
     @classmethod
     def from_dict(cls, data: Dict):
         criteria = [RubricCriteria.from_dict(c) for c in data['criteria']]
@@ -72,11 +138,23 @@ class GradingRubric:
         )
 
 
+@lru_cache(maxsize=1)
+def _default_rubrics() -> Dict[str, GradingRubric]:
+    """Default rubrics, built once per process"""
+    return GradingService._build_default_rubrics()
+
+
 class GradingService:
     """Service for advanced grading functionality"""
     
     @staticmethod
     def create_default_rubrics():
+        """Get the default rubrics for common subjects"""
+        # The rubrics are shared between calls; only the dict is copied
+        return dict(_default_rubrics())
+    
+    @staticmethod
+    def _build_default_rubrics():
         """Create default rubrics for common subjects"""
         
         # Essay Writing Rubric
@@ -366,51 +444,60 @@ class GradingService:
         total_score = 0
         feedback_parts = []
         
-        for criteria in rubric.criteria:
-            # Create AI prompt for this criteria
-            prompt = f"""
-            Evaluate the following student work based on this criteria:
-            
-            Criteria: {criteria.name}
-            Description: {criteria.description}
-            Maximum Points: {criteria.points}
-            
-            Performance Levels:
-            {json.dumps(criteria.performance_levels, indent=2)}
-            
-            Student Work:
-            {content}
-            
-            Please evaluate and respond with:
-            1. Performance level (excellent/good/satisfactory/needs_improvement)
-            2. Score within the appropriate range
-            3. Specific feedback explaining the score
-            4. Suggestions for improvement
+        # One prompt covers every criterion, so grading costs a single AI
+        # round trip rather than one per criterion
+        prompt = f"""
+        Evaluate the following student work based on each of these criteria:
+        
+        {rubric.criteria_json}
+        
+        Student Work:
+        {content}
+        
+        For each criteria, in the order given, please evaluate and provide:
+        1. Performance level (excellent/good/satisfactory/needs_improvement)
+        2. Score within the appropriate range
+        3. Specific feedback explaining the score
+        4. Suggestions for improvement
+        
+        Format your response as a JSON array with one object per criteria,
+        with keys: name, level, score, feedback, suggestions
+        """
+        
+        try:
+            # Get AI evaluation
+            ai_response = ai_service.generate_content(
+                prompt=prompt,
+                max_tokens=500 * len(rubric.criteria),
+                temperature=0.3
+            )
             
-            Format your response as JSON with keys: level, score, feedback, suggestions
-            """
+            # Parse AI response
+            evaluations = GradingService._parse_ai_evaluation_batch(
+                ai_response, rubric.criteria
+            )
+        except Exception as e:
+            evaluations = {}
+        
+        # Criteria the batch did not cover are evaluated one per prompt,
+        # with the prompts sent concurrently
+        missing = [c for c in rubric.criteria if c.name not in evaluations]
+        if missing:
+            evaluations.update(
+                GradingService._evaluate_criteria_individually(ai_service, content, missing)
+            )
+        
+        for criteria in rubric.criteria:
+            ai_evaluation = evaluations.get(criteria.name)
             
-            try:
-                # Get AI evaluation
-                ai_response = ai_service.generate_content(
-                    prompt=prompt,
-                    max_tokens=500,
-                    temperature=0.3
-                )
-                
-                # Parse AI response
-                ai_evaluation = GradingService._parse_ai_evaluation(
-                    ai_response, criteria
-                )
-                
+            if ai_evaluation:
                 grade_results[criteria.name] = ai_evaluation
                 total_score += ai_evaluation['score']
                 
                 feedback_parts.append(
                     f"{criteria.name}: {ai_evaluation['feedback']}"
                 )
-                
-            except Exception as e:
+            else:
                 # Fallback to basic scoring if AI fails
                 fallback_score = criteria.points * 0.7  # Default to 70%
                 grade_results[criteria.name] = {
@@ -446,12 +533,12 @@ class GradingService:
             'graded_at': datetime.utcnow().isoformat()
         }
         
-        # Cache detailed results
+        db.session.commit()
+        
+        # Cache detailed results once the grade is saved
         cache_key = f"rubric_results:{submission_id}"
         redis_service.cache_data(cache_key, rubric_data, timeout=86400)  # 24 hours
         
-        db.session.commit()
-        
         return {
             'success': True,
             'grade': percentage,
@@ -459,13 +546,68 @@ class GradingService:
             'rubric_results': rubric_data
         }
     
+    @staticmethod
+    def _evaluate_criteria_individually(ai_service: AIService, content: str,
+                                        criteria_list: List[RubricCriteria]) -> Dict[str, Dict]:
+        """
+        Evaluate each criteria with its own AI prompt, all in parallel
+        
+        Returns evaluations keyed by criteria name, leaving out criteria
+        whose AI call failed.
+        """
+        app = current_app._get_current_object()
+        
+        def evaluate(criteria):
+            prompt = f"""
+            Evaluate the following student work based on this criteria:
+            
+            Criteria: {criteria.name}
+            Description: {criteria.description}
+            Maximum Points: {criteria.points}
+            
+            Performance Levels:
+            {criteria.levels_json}
+            
+            Student Work:
+            {content}
+            
+            Please evaluate and respond with:
+            1. Performance level (excellent/good/satisfactory/needs_improvement)
+            2. Score within the appropriate range
+            3. Specific feedback explaining the score
+            4. Suggestions for improvement
+            
+            Format your response as JSON with keys: level, score, feedback, suggestions
+            """
+            
+            with app.app_context():
+                ai_response = ai_service.generate_content(
+                    prompt=prompt,
+                    max_tokens=500,
+                    temperature=0.3
+                )
+                return GradingService._parse_ai_evaluation(ai_response, criteria)
+        
+        evaluations = {}
+        with ThreadPoolExecutor(max_workers=len(criteria_list)) as executor:
+            futures = {
+                criteria.name: executor.submit(evaluate, criteria)
+                for criteria in criteria_list
+            }
+            for name, future in futures.items():
+                try:
+                    evaluations[name] = future.result()
+                except Exception:
+                    continue
+        
+        return evaluations
+    
     @staticmethod
     def _parse_ai_evaluation(ai_response: str, criteria: RubricCriteria) -> Dict:
         """Parse AI evaluation response"""
         try:
             # Try to extract JSON from AI response
-            import re
-            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+            json_match = _JSON_OBJECT_RE.search(ai_response)
             if json_match:
                 evaluation = json.loads(json_match.group())
             else:
@@ -474,24 +616,7 @@ class GradingService:
                     ai_response, criteria
                 )
             
-            # Validate and normalize
-            level = evaluation.get('level', 'satisfactory')
-            if level not in criteria.performance_levels:
-                level = 'satisfactory'
-            
-            # Get score range for this level
-            score_range = criteria.performance_levels[level]['points_range']
-            suggested_score = evaluation.get('score', score_range[1])
-            
-            # Ensure score is within valid range
-            score = max(score_range[0], min(score_range[1], suggested_score))
-            
-            return {
-                'level': level,
-                'score': score,
-                'feedback': evaluation.get('feedback', 'Good work overall.'),
-                'suggestions': evaluation.get('suggestions', 'Keep up the good work!')
-            }
+            return GradingService._normalize_evaluation(evaluation, criteria)
             
         except Exception as e:
             # Fallback to middle performance level
@@ -504,21 +629,91 @@ class GradingService:
                 'suggestions': f"Focus on improving {criteria.description.lower()}."
             }
     
+    @staticmethod
+    def _parse_ai_evaluation_batch(ai_response: str,
+                                   criteria_list: List[RubricCriteria]) -> Dict[str, Dict]:
+        """
+        Parse an AI evaluation covering several criteria
+        
+        Returns evaluations keyed by criteria name. Entries are matched by
+        name, or by position when the name is missing or unknown; criteria
+        without a usable entry are left out for the caller to fall back on.
+        """
+        json_match = _JSON_ARRAY_RE.search(ai_response)
+        if not json_match:
+            return {}
+        
+        try:
+            entries = json.loads(json_match.group())
+        except ValueError:
+            return {}
+        if not isinstance(entries, list):
+            return {}
+        
+        criteria_by_name = {criteria.name: criteria for criteria in criteria_list}
+        evaluations = {}
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                continue
+            criteria = criteria_by_name.get(entry.get('name'))
+            if criteria is None and index < len(criteria_list):
+                criteria = criteria_list[index]
+            if criteria is None or criteria.name in evaluations:
+                continue
+            
+            try:
+                evaluations[criteria.name] = GradingService._normalize_evaluation(entry, criteria)
+            except Exception:
+                continue
+        
+        return evaluations
+    
+    @staticmethod
+    def _normalize_evaluation(evaluation: Dict, criteria: RubricCriteria) -> Dict:
+        """Validate an AI evaluation, clamping its score to the level's range"""
+        level = evaluation.get('level', 'satisfactory')
+        if level not in criteria.performance_levels:
+            level = 'satisfactory'
+        
+        # Get score range for this level
+        score_range = criteria.performance_levels[level]['points_range']
+        suggested_score = evaluation.get('score', score_range[1])
+        
+        # Ensure score is within valid range
+        score = max(score_range[0], min(score_range[1], suggested_score))
+        
+        return {
+            'level': level,
+            'score': score,
+            'feedback': evaluation.get('feedback', 'Good work overall.'),
+            'suggestions': evaluation.get('suggestions', 'Keep up the good work!')
+        }
+    
     @staticmethod
     def _fallback_parse_evaluation(response: str, criteria: RubricCriteria) -> Dict:
         """Fallback method to parse evaluation when JSON parsing fails"""
-        response_lower = response.lower()
+        # Count every run of up to max_keyword_words words in the response,
+        # so keyword phrases are matched with dict lookups
+        words = _WORD_RE.findall(response.lower())
+        phrases = Counter()
+        for length in range(1, criteria.max_keyword_words + 1):
+            phrases.update(
+                ' '.join(words[start:start + length])
+                for start in range(len(words) - length + 1)
+            )
         
-        # Determine performance level based on keywords
+        # Determine performance level based on keywords, picking the level
+        # whose keywords occur most often (the earliest on a tie)
         level = 'satisfactory'
-        for perf_level, data in criteria.performance_levels.items():
-            keywords = data.get('keywords', [])
-            if any(keyword.lower() in response_lower for keyword in keywords):
+        best_matches = 0
+        for perf_level, keywords in criteria.level_keywords.items():
+            matches = sum(phrases[keyword] for keyword in keywords)
+            if matches > best_matches:
                 level = perf_level
-                break
+                best_matches = matches
         
         # Extract score if mentioned
-        score_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:points?|/)', response)
+        score_match = _SCORE_RE.search(response)
         if score_match:
             score = float(score_match.group(1))
         else:
@@ -537,37 +732,37 @@ class GradingService:
     def _generate_overall_feedback(grade_results: Dict, percentage: float, 
                                  rubric: GradingRubric) -> str:
         """Generate comprehensive overall feedback"""
-        feedback_parts = ["=== GRADING FEEDBACK ===\n"]
+        feedback_parts = [_FEEDBACK_HEADER]
         
         # Overall performance
         if percentage >= 90:
-            feedback_parts.append("🌟 Excellent work! You've demonstrated mastery of the material.")
+            feedback_parts.append(_FEEDBACK_EXCELLENT)
         elif percentage >= 80:
-            feedback_parts.append("👍 Good work! You show strong understanding with room for refinement.")
+            feedback_parts.append(_FEEDBACK_GOOD)
         elif percentage >= 70:
-            feedback_parts.append("✓ Satisfactory work. You meet basic requirements but can improve further.")
+            feedback_parts.append(_FEEDBACK_SATISFACTORY)
         else:
-            feedback_parts.append("⚠️ This work needs improvement. Please review the feedback below.")
+            feedback_parts.append(_FEEDBACK_NEEDS_IMPROVEMENT)
         
         feedback_parts.append(f"\nOverall Score: {percentage:.1f}%\n")
         
         # Criteria-specific feedback
-        feedback_parts.append("=== DETAILED FEEDBACK BY CRITERIA ===\n")
+        feedback_parts.append(_FEEDBACK_CRITERIA_HEADER)
         
         strengths = []
         improvements = []
         
         for criteria_name, results in grade_results.items():
-            criteria_feedback = f"{criteria_name}: {results['score']:.1f} points"
-            feedback_parts.append(criteria_feedback)
-            feedback_parts.append(f"  {results['feedback']}")
+            feedback_parts.append(
+                f"{criteria_name}: {results['score']:.1f} points\n"
+                f"  {results['feedback']}\n"
+                f"  💡 Suggestion: {results['suggestions']}\n"
+            )
             
-            if results['level'] in ['excellent', 'good']:
+            if results['level'] in ('excellent', 'good'):
                 strengths.append(criteria_name)
             elif results['level'] == 'needs_improvement':
                 improvements.append(criteria_name)
-            
-            feedback_parts.append(f"  💡 Suggestion: {results['suggestions']}\n")
         
         # Summary of strengths and areas for improvement
         if strengths:
@@ -576,10 +771,7 @@ class GradingService:
         if improvements:
             feedback_parts.append(f"📈 FOCUS AREAS: {', '.join(improvements)}")
         
-        feedback_parts.append("\n=== NEXT STEPS ===")
-        feedback_parts.append("Review the specific feedback for each criteria above.")
-        feedback_parts.append("Focus on the areas marked for improvement.")
-        feedback_parts.append("Don't hesitate to ask your teacher for clarification or additional help.")
+        feedback_parts.append(_FEEDBACK_NEXT_STEPS)
         
         return "\n".join(feedback_parts)
     
@@ -597,8 +789,8 @@ class GradingService:
         if not assignment:
             return {'error': 'Assignment not found'}
         
-        # Get all submissions for this assignment
-        submissions = Submission.query.filter_by(
+        # Get all submissions for this assignment; only the ids are needed
+        submissions = db.session.query(Submission.id, Submission.student_id).filter_by(
             assignment_id=assignment_id,
             status='submitted'
         ).all()
@@ -631,36 +823,30 @@ class GradingService:
         }
     
     @staticmethod
-    def _create_peer_review_pairings(submissions: List[Submission], 
+    def _create_peer_review_pairings(submissions: List[Tuple[int, int]], 
                                    reviews_per_student: int) -> List[Dict]:
-        """Create balanced peer review pairings"""
-        import random
-        
-        student_ids = [s.student_id for s in submissions]
-        submission_map = {s.student_id: s.id for s in submissions}
+        """Create balanced peer review pairings from (submission_id, student_id) rows"""
+        submission_map = {student_id: submission_id for submission_id, student_id in submissions}
+        student_ids = list(submission_map)
+        random.shuffle(student_ids)
         
-        pairings = []
-        
-        for student_id in student_ids:
-            # Get other students (exclude self)
-            other_students = [sid for sid in student_ids if sid != student_id]
-            
-            # Randomly select students to review
-            reviewees = random.sample(
-                other_students, 
-                min(reviews_per_student, len(other_students))
-            )
-            
-            for reviewee_id in reviewees:
-                pairings.append({
-                    'reviewer_id': student_id,
-                    'reviewee_id': reviewee_id,
-                    'submission_id': submission_map[reviewee_id],
-                    'status': 'pending',
-                    'assigned_at': datetime.utcnow().isoformat()
-                })
+        # Each round shifts the shuffled list by a distinct offset, so every
+        # student reviews and is reviewed exactly once per round
+        count = len(student_ids)
+        offsets = random.sample(range(1, count), min(reviews_per_student, count - 1))
+        assigned_at = datetime.utcnow().isoformat()
         
-        return pairings
+        return [
+            {
+                'reviewer_id': student_ids[i],
+                'reviewee_id': student_ids[(i + offset) % count],
+                'submission_id': submission_map[student_ids[(i + offset) % count]],
+                'status': 'pending',
+                'assigned_at': assigned_at
+            }
+            for i in range(count)
+            for offset in offsets
+        ]
     
     @staticmethod
     def submit_peer_review(reviewer_id: int, submission_id: int, 
@@ -712,7 +898,7 @@ class GradingService:
             
             if peer_scores:
                 # Weight: 80% rubric, 20% peer reviews
-                peer_average = statistics.mean(peer_scores)
+                peer_average = sum(peer_scores) / len(peer_scores)
                 final_score = (base_score * 0.8) + (peer_average * 0.2)
         
         # Update submission with final grade
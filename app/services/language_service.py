@@ -733,17 +733,23 @@ def register_language_helpers(app):
     @app.template_global()
     def translate_term(term):
         """Template function to translate educational terms and content"""
-        from app.services.content_service import get_content
+        from app.services.content_service import get_content, content_fallback
         current_lang = LanguageService.get_current_language()
         
         # Try content service first, then education terms
         content = get_content(term, current_lang)
-        if content != term.title().replace('_', ' '):
+        if content != content_fallback(term):
             return content
         
         # Fallback to education terms
         return get_translated_term(term, current_lang)
     
+    @app.template_global()
+    def page_content(*keys):
+        """Template function to get several content strings in one call"""
+        from app.services.content_service import get_many
+        return get_many(keys, LanguageService.get_current_language())
+    
     @app.template_filter()
     def language_name(code):
         """Template filter to get language display name"""
@@ -4,6 +4,7 @@ Provides helper functions for common caching operations.
 """
 import json
 import pickle
+import time
 from typing import Any, Optional, Union
 from datetime import timedelta
 from app.extensions import redis_client, cache
@@ -63,6 +64,30 @@ class RedisService:
         except Exception:
             return False
     
+    # Generic JSON Caching
+    def cache_data(self, cache_key: str, data: Any, timeout: int = 300) -> bool:
+        """Cache JSON-serializable data under cache_key."""
+        if not self.redis_available:
+            return False
+            
+        try:
+            # Compact separators keep large nested results smaller to encode and store
+            serialized_data = json.dumps(data, default=str, separators=(',', ':'))
+            return self.redis.setex(cache_key, timeout, serialized_data)
+        except Exception:
+            return False
+    
+    def get_cached_data(self, cache_key: str) -> Optional[Any]:
+        """Get data cached with cache_data."""
+        if not self.redis_available:
+            return None
+            
+        try:
+            data = self.redis.get(cache_key)
+            return json.loads(data) if data else None
+        except Exception:
+            return None
+    
     # Dashboard & Stats Caching
     def cache_teacher_stats(self, teacher_id: int, stats: dict,
                            expire: int = 300) -> bool:
@@ -179,6 +204,196 @@ class RedisService:
         except Exception:
             return None
     
+    # Messaging Counters
+    def cache_unread_count(self, user_id: int, count: int,
+                          expire: int = 60) -> bool:
+        """Cache a user's unread message count for 1 minute."""
+        if not self.redis_available:
+            return False
+            
+        cache_key = f"user:{user_id}:unread_messages"
+        try:
+            return self.redis.setex(cache_key, expire, count)
+        except Exception:
+            return False
+    
+    def get_unread_count(self, user_id: int) -> Optional[int]:
+        """Get a cached unread message count."""
+        if not self.redis_available:
+            return None
+            
+        cache_key = f"user:{user_id}:unread_messages"
+        try:
+            data = self.redis.get(cache_key)
+            return int(data) if data is not None else None
+        except Exception:
+            return None
+    
+    def invalidate_unread_counts(self, user_ids: list) -> bool:
+        """Drop cached unread message counts for the given users."""
+        if not self.redis_available or not user_ids:
+            return False
+            
+        try:
+            keys = [f"user:{user_id}:unread_messages" for user_id in user_ids]
+            return bool(self.redis.delete(*keys))
+        except Exception:
+            return False
+    
+    def invalidate_all_unread_counts(self) -> bool:
+        """Drop every cached unread message count."""
+        if not self.redis_available:
+            return False
+            
+        try:
+            keys = self.redis.keys("user:*:unread_messages")
+            if keys:
+                return bool(self.redis.delete(*keys))
+            return True
+        except Exception:
+            return False
+    
+    # Listing Totals
+    def cache_listing_total(self, count_key: str, total: int,
+                            expire: int = 30) -> bool:
+        """Cache a paginated listing's row count for 30 seconds."""
+        if not self.redis_available:
+            return False
+            
+        try:
+            return self.redis.setex(f"listing:total:{count_key}", expire, total)
+        except Exception:
+            return False
+    
+    def get_listing_total(self, count_key: str) -> Optional[int]:
+        """Get a cached listing row count."""
+        if not self.redis_available:
+            return None
+            
+        try:
+            data = self.redis.get(f"listing:total:{count_key}")
+            return int(data) if data is not None else None
+        except Exception:
+            return None
+    
+    def invalidate_listing_totals(self, count_keys: list) -> bool:
+        """Drop cached row counts for listings that have just changed."""
+        if not self.redis_available or not count_keys:
+            return False
+            
+        try:
+            keys = [f"listing:total:{count_key}" for count_key in count_keys]
+            return bool(self.redis.delete(*keys))
+        except Exception:
+            return False
+    
+    def invalidate_listing_totals_matching(self, pattern: str) -> bool:
+        """Drop every cached listing row count whose key matches pattern."""
+        if not self.redis_available:
+            return False
+            
+        try:
+            keys = self.redis.keys(f"listing:total:{pattern}")
+            if keys:
+                return bool(self.redis.delete(*keys))
+            return True
+        except Exception:
+            return False
+    
+    # Email Job Queue
+    def enqueue_email_job(self, job: dict) -> bool:
+        """Push an email delivery job onto the shared email queue."""
+        if not self.redis_available:
+            return False
+    
+        try:
+            return bool(self.redis.lpush("email:queue", json.dumps(job)))
+        except Exception:
+            return False
+    
+    def dequeue_email_job(self, timeout: int = 5) -> Optional[dict]:
+        """Pop the oldest email job, waiting up to timeout seconds."""
+        try:
+            item = self.redis.brpop("email:queue", timeout=timeout)
+            return json.loads(item[1]) if item else None
+        except Exception:
+            return None
+    
+    def schedule_email_retry(self, job: dict, delay: int) -> bool:
+        """Hold an email job back for delay seconds before it is retried."""
+        try:
+            due = time.time() + delay
+            return bool(self.redis.zadd("email:retry", {json.dumps(job): due}))
+        except Exception:
+            return False
+    
+    def requeue_due_email_retries(self) -> int:
+        """Move retries whose delay has passed back onto the email queue."""
+        try:
+            moved = 0
+            for item in self.redis.zrangebyscore("email:retry", 0, time.time()):
+                # Only the worker that removes the entry requeues it
+                if self.redis.zrem("email:retry", item):
+                    self.redis.lpush("email:queue", item)
+                    moved += 1
+            return moved
+        except Exception:
+            return 0
+    
+    def claim_email_send(self, key: str, expire: int) -> Optional[bool]:
+        """Claim an email's dedup key; False if it was sent within expire seconds."""
+        if not self.redis_available:
+            return None
+    
+        try:
+            return bool(self.redis.set(f"email:sent:{key}", 1, nx=True, ex=expire))
+        except Exception:
+            return None
+    
+    def release_email_send(self, key: str) -> bool:
+        """Release a dedup key so a failed email can be sent again."""
+        try:
+            return bool(self.redis.delete(f"email:sent:{key}"))
+        except Exception:
+            return False
+    
+    # Forum Caching
+    def cache_forum_posts(self, cache_key: str, result: dict,
+                         expire: int = 60) -> bool:
+        """Cache a forum post listing for 1 minute."""
+        if not self.redis_available:
+            return False
+            
+        try:
+            serialized_result = json.dumps(result, default=str)
+            return self.redis.setex(f"forum:posts:{cache_key}", expire, serialized_result)
+        except Exception:
+            return False
+    
+    def get_forum_posts(self, cache_key: str) -> Optional[dict]:
+        """Get a cached forum post listing."""
+        if not self.redis_available:
+            return None
+            
+        try:
+            data = self.redis.get(f"forum:posts:{cache_key}")
+            return json.loads(data) if data else None
+        except Exception:
+            return None
+    
+    def invalidate_forum_posts(self) -> bool:
+        """Invalidate every cached forum post listing."""
+        if not self.redis_available:
+            return False
+            
+        try:
+            keys = self.redis.keys("forum:posts:*")
+            if keys:
+                return bool(self.redis.delete(*keys))
+            return True
+        except Exception:
+            return False
+    
     # Cache Invalidation
     def invalidate_teacher_cache(self, teacher_id: int) -> bool:
         """Invalidate all teacher-related cache."""
@@ -29,6 +29,23 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     
+    # Communication analytics read from the daily rollup table when enabled;
+    # run scripts/refresh_communication_stats.py on a schedule to keep it fresh
+    COMMUNICATION_ANALYTICS_ROLLUP = os.environ.get('COMMUNICATION_ANALYTICS_ROLLUP', 'false').lower() in ['true', 'on', '1']
+    
+    # Deliver announcements to recipients in a background thread so the
+    # request returns as soon as the message row is written. Off by default:
+    # a fan-out cut off by a crash or forced restart is not resumed
+    ANNOUNCEMENT_FANOUT_ASYNC = os.environ.get('ANNOUNCEMENT_FANOUT_ASYNC', 'false').lower() in ['true', 'on', '1']
+    
+    # Send notification emails from background worker threads so requests
+    # do not wait on SMTP
+    EMAIL_SEND_ASYNC = os.environ.get('EMAIL_SEND_ASYNC', 'true').lower() in ['true', 'on', '1']
+    
+    # 'thread' sends from worker threads in each web process; 'redis' hands
+    # jobs to scripts/run_email_worker.py processes, which retry failures
+    EMAIL_QUEUE_BACKEND = os.environ.get('EMAIL_QUEUE_BACKEND', 'thread').lower()
+    
     # Security & Session Configuration
     WTF_CSRF_ENABLED = True
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
@@ -67,6 +84,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    ANNOUNCEMENT_FANOUT_ASYNC = False
+    EMAIL_SEND_ASYNC = False
 
 config = {
     'development': DevelopmentConfig,
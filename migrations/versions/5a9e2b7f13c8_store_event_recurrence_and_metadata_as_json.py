@@ -0,0 +1,40 @@
+"""Store event recurrence and metadata as JSON
+
+Revision ID: 5a9e2b7f13c8
+Revises: d41f8a6c0e57
+Create Date: 2026-10-17 10:21:33.457190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5a9e2b7f13c8'
+down_revision = 'd41f8a6c0e57'
+branch_labels = None
+depends_on = None
+
+
+JSON_COLUMNS = ['recurrence_rule', 'event_metadata']
+
+
+def upgrade():
+    json_type = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        for column in JSON_COLUMNS:
+            batch_op.alter_column(column,
+                                  existing_type=sa.Text(),
+                                  type_=json_type,
+                                  postgresql_using=f'{column}::jsonb')
+
+
+def downgrade():
+    json_type = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        for column in JSON_COLUMNS:
+            batch_op.alter_column(column,
+                                  existing_type=json_type,
+                                  type_=sa.Text(),
+                                  postgresql_using=f'{column}::text')
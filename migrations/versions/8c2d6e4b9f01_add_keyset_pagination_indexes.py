@@ -0,0 +1,38 @@
+"""Add keyset pagination indexes
+
+Revision ID: 8c2d6e4b9f01
+Revises: 5a9e2b7f13c8
+Create Date: 2026-10-17 11:05:17.624931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d6e4b9f01'
+down_revision = '5a9e2b7f13c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_message_created_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('forum_posts', schema=None) as batch_op:
+        batch_op.create_index('ix_forum_post_created_id', ['created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_created_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_created_id')
+
+    with op.batch_alter_table('forum_posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_forum_post_created_id')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_created_id')
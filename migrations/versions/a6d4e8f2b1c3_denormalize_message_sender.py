@@ -0,0 +1,29 @@
+"""Denormalize sender name and role onto messages
+
+Revision ID: a6d4e8f2b1c3
+Revises: f3a7b5c8d2e6
+Create Date: 2026-10-17 12:31:46.902715
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d4e8f2b1c3'
+down_revision = 'f3a7b5c8d2e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are filled by scripts/refresh_message_senders.py
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sender_name', sa.String(length=201), nullable=True))
+        batch_op.add_column(sa.Column('sender_role', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_column('sender_role')
+        batch_op.drop_column('sender_name')
@@ -0,0 +1,53 @@
+"""Add calendar and assignment indexes
+
+Revision ID: b7e3c1d9a2f4
+Revises: 4455188711ea
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3c1d9a2f4'
+down_revision = '4455188711ea'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.create_index('ix_event_creator_start', ['creator_id', 'start_datetime'], unique=False)
+        batch_op.create_index('ix_event_start', ['start_datetime'], unique=False)
+
+    with op.batch_alter_table('event_attendees', schema=None) as batch_op:
+        batch_op.create_index('ix_attendee_user_event', ['user_id', 'event_id'], unique=False)
+        batch_op.create_index('ix_attendee_invited', ['invited_at'], unique=False)
+
+    # Only unsent, active reminders are ever polled; Postgres/SQLite keep the
+    # index partial, MySQL ignores the predicate and builds a full composite.
+    with op.batch_alter_table('event_reminders', schema=None) as batch_op:
+        batch_op.create_index('ix_reminder_active_unsent', ['is_active', 'sent_at'], unique=False,
+                              postgresql_where=sa.text('is_active AND sent_at IS NULL'),
+                              sqlite_where=sa.text('is_active AND sent_at IS NULL'))
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.create_index('ix_assignment_teacher_due_active',
+                              ['teacher_id', 'due_date', 'is_active'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.drop_index('ix_assignment_teacher_due_active')
+
+    with op.batch_alter_table('event_reminders', schema=None) as batch_op:
+        batch_op.drop_index('ix_reminder_active_unsent')
+
+    with op.batch_alter_table('event_attendees', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendee_invited')
+        batch_op.drop_index('ix_attendee_user_event')
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_start')
+        batch_op.drop_index('ix_event_creator_start')
@@ -0,0 +1,48 @@
+"""Add communication composite indexes
+
+Revision ID: c9e1f4a7d3b2
+Revises: a6d4e8f2b1c3
+Create Date: 2026-10-17 13:04:22.517390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e1f4a7d3b2'
+down_revision = 'a6d4e8f2b1c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('message_recipients', schema=None) as batch_op:
+        batch_op.create_index('ix_mr_recip_unread', ['recipient_id', 'is_read'], unique=False)
+        batch_op.create_index('ix_mr_recip_archived', ['recipient_id', 'is_archived', 'message_id'], unique=False)
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_msg_sender_created', ['sender_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('forum_posts', schema=None) as batch_op:
+        batch_op.create_index('ix_post_cat_created', ['category', 'created_at'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notif_user_created', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_notif_user_read_created', ['user_id', 'is_read', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notif_user_read_created')
+        batch_op.drop_index('ix_notif_user_created')
+
+    with op.batch_alter_table('forum_posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_cat_created')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_msg_sender_created')
+
+    with op.batch_alter_table('message_recipients', schema=None) as batch_op:
+        batch_op.drop_index('ix_mr_recip_archived')
+        batch_op.drop_index('ix_mr_recip_unread')
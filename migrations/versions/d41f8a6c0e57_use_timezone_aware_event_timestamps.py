@@ -0,0 +1,45 @@
+"""Use timezone-aware event timestamps
+
+Revision ID: d41f8a6c0e57
+Revises: b7e3c1d9a2f4
+Create Date: 2026-10-17 09:48:05.902716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41f8a6c0e57'
+down_revision = 'b7e3c1d9a2f4'
+branch_labels = None
+depends_on = None
+
+
+TIMESTAMP_COLUMNS = {
+    'events': ['start_datetime', 'end_datetime', 'created_at', 'updated_at'],
+    'event_attendees': ['invited_at', 'responded_at'],
+    'event_reminders': ['sent_at', 'created_at'],
+}
+
+
+# Stored values are naive UTC; read them as UTC rather than in the
+# server's session TimeZone, and write them back as UTC on downgrade
+def upgrade():
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                                      existing_type=sa.DateTime(),
+                                      type_=sa.DateTime(timezone=True),
+                                      postgresql_using=f"{column} AT TIME ZONE 'UTC'")
+
+
+def downgrade():
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column,
+                                      existing_type=sa.DateTime(timezone=True),
+                                      type_=sa.DateTime(),
+                                      postgresql_using=f"{column} AT TIME ZONE 'UTC'")
@@ -0,0 +1,40 @@
+"""Store message attachments and forum post tags as JSON
+
+Revision ID: e8b2d5f9a4c1
+Revises: c9e1f4a7d3b2
+Create Date: 2026-10-17 13:40:58.063214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b2d5f9a4c1'
+down_revision = 'c9e1f4a7d3b2'
+branch_labels = None
+depends_on = None
+
+
+JSON_COLUMNS = [('messages', 'attachments'), ('forum_posts', 'tags')]
+
+
+def upgrade():
+    json_type = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+    for table, column in JSON_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column,
+                                  existing_type=sa.Text(),
+                                  type_=json_type,
+                                  postgresql_using=f'{column}::jsonb')
+
+
+def downgrade():
+    json_type = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+    for table, column in reversed(JSON_COLUMNS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column,
+                                  existing_type=json_type,
+                                  type_=sa.Text(),
+                                  postgresql_using=f'{column}::text')
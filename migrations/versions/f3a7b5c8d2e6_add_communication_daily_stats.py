@@ -0,0 +1,41 @@
+"""Add communication daily stats rollup
+
+Revision ID: f3a7b5c8d2e6
+Revises: 8c2d6e4b9f01
+Create Date: 2026-10-17 11:52:09.184376
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7b5c8d2e6'
+down_revision = '8c2d6e4b9f01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('communication_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('messages_sent', sa.Integer(), nullable=True),
+    sa.Column('messages_received', sa.Integer(), nullable=True),
+    sa.Column('forum_posts', sa.Integer(), nullable=True),
+    sa.Column('notifications_received', sa.Integer(), nullable=True),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'day', name='unique_user_daily_stat')
+    )
+    with op.batch_alter_table('communication_daily_stats', schema=None) as batch_op:
+        batch_op.create_index('ix_communication_daily_stat_day', ['day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('communication_daily_stats', schema=None) as batch_op:
+        batch_op.drop_index('ix_communication_daily_stat_day')
+
+    op.drop_table('communication_daily_stats')
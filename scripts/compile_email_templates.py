@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+SACEL Email Template Compiler
+Compiles the email bodies in app/templates/emails ahead of time so workers
+load them as Python modules instead of parsing them on first render.
+Run as part of each deploy, after the templates have been updated:
+    cd /srv/sacel && python scripts/compile_email_templates.py
+Delete app/templates/emails_compiled to go back to compiling on load.
+"""
+
+import os
+import sys
+
+# Add the parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.email_service import (
+    COMPILED_EMAIL_TEMPLATE_DIR, email_environment, email_template_loader
+)
+
+
+def main():
+    """Compile every email template into the compiled template directory"""
+    env = email_environment(email_template_loader())
+    
+    env.compile_templates(COMPILED_EMAIL_TEMPLATE_DIR, zip=None, ignore_errors=False)
+    
+    print(f"✓ Compiled {len(env.list_templates())} email templates into {COMPILED_EMAIL_TEMPLATE_DIR}")
+
+if __name__ == '__main__':
+    main()
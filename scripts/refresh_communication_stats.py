@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+SACEL Communication Analytics Refresh
+Rebuilds the daily communication rollup read by the analytics endpoint.
+Intended to run from cron, e.g. hourly:
+    0 * * * * cd /srv/sacel && python scripts/refresh_communication_stats.py
+"""
+
+import os
+import sys
+
+# Add the parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.communication_service import CommunicationService
+
+
+def main():
+    """Run the rollup refresh"""
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 366
+    
+    app = create_app()
+    with app.app_context():
+        result = CommunicationService.refresh_analytics_rollup(days=days)
+        
+        if result["success"]:
+            print(f"✓ Refreshed {result['rows_written']} daily rows since {result['start_date']}")
+        else:
+            print(f"❌ Refresh failed: {result['error']}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+SACEL Message Sender Refresh
+Rewrites the sender name/role stored on messages. Run once after the
+denormalization migration, and after bulk renames or role changes:
+    python scripts/refresh_message_senders.py [user_id ...]
+"""
+
+import os
+import sys
+
+# Add the parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.communication_service import CommunicationService
+
+
+def main():
+    """Run the sender snapshot refresh"""
+    user_ids = [int(arg) for arg in sys.argv[1:]] or None
+    
+    app = create_app()
+    with app.app_context():
+        result = CommunicationService.refresh_sender_snapshots(user_ids=user_ids)
+        
+        if result["success"]:
+            print(f"✓ Refreshed messages for {result['senders_refreshed']} senders")
+        else:
+            print(f"❌ Refresh failed: {result['error']}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
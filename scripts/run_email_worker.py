@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+SACEL Email Worker
+Delivers emails queued in Redis when EMAIL_QUEUE_BACKEND=redis. Run as many
+processes as the SMTP provider allows; each holds its own connection pool:
+    EMAIL_QUEUE_BACKEND=redis python scripts/run_email_worker.py
+"""
+
+import os
+import sys
+
+# Add the parent directory to path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.email_service import email_service
+from app.services.redis_service import redis_service
+
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 30
+
+
+def main():
+    """Deliver queued emails until interrupted"""
+    app = create_app()
+    with app.app_context():
+        if not redis_service.redis_available:
+            print("❌ Redis is not available")
+            sys.exit(1)
+        
+        print("✓ Waiting for queued emails")
+        while True:
+            redis_service.requeue_due_email_retries()
+            job = redis_service.dequeue_email_job(timeout=5)
+            if job is None:
+                continue
+            
+            try:
+                delivered = email_service.run_queued_job(job)
+            except Exception as e:
+                app.logger.error(f"Queued email delivery failed: {e}")
+                delivered = False
+            
+            if delivered:
+                continue
+            
+            # Bulk jobs are not retried: part of the batch may already
+            # have been sent, and a retry would send it again
+            if job['deliver'] == '_deliver_email':
+                if job['attempts'] < MAX_RETRIES:
+                    delay = RETRY_BACKOFF_SECONDS * 2 ** job['attempts']
+                    job['attempts'] += 1
+                    redis_service.schedule_email_retry(job, delay)
+                    continue
+                app.logger.error(f"Giving up on email to {job['args'][0]} after {MAX_RETRIES} retries")
+            
+            # Let the same email be sent again now that this one failed
+            if job.get('dedup_key'):
+                redis_service.release_email_send(job['dedup_key'])
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass